@@ -9,8 +9,15 @@ Run this locally once, then deploy the .pkl file with web_app.py.
 import pickle
 import time
 from config import BBOX
+from compact_graph import build_compact_graph, save_compact_graph
 from graph_builder import build_safe_graph
 
+try:
+    import zstandard
+    HAS_ZSTD = True
+except Exception:
+    HAS_ZSTD = False
+
 # Attributes to keep for routing and visualization
 KEEP_ATTRS = {
     'geometry',           # For rendering and route geometry
@@ -110,7 +117,27 @@ if __name__ == '__main__':
     output_file = 'graph_prebuilt.pkl'
     print(f"[4] Saving to {output_file}...")
     with open(output_file, 'wb') as f:
-        pickle.dump((G, lights, businesses, BBOX), f)
+        pickle.dump((G, lights, businesses, BBOX), f, protocol=5)
+    print(f"    Done!")
+    if HAS_ZSTD:
+        # web_app.py prefers the zstd copy: it decompresses several times faster than gzip
+        zst_file = output_file + '.zst'
+        print(f"    Writing zstd copy to {zst_file}...")
+        with open(zst_file, 'wb') as f:
+            with zstandard.ZstdCompressor(level=6, threads=-1).stream_writer(f, closefd=False) as writer:
+                pickle.dump((G, lights, businesses, BBOX), writer, protocol=5)
+        print(f"    Done!")
+
+    # Memory-mappable copy of the routing arrays; web_app.py loads this instead of
+    # unpickling when it is newer than the pickle
+    compact_dir = 'graph_prebuilt'
+    print(f"    Writing compact graph arrays to {compact_dir}/...")
+    save_compact_graph(
+        build_compact_graph(G), compact_dir,
+        bbox=list(BBOX),
+        lights=[list(p) for p in lights] if lights else [],
+        businesses=businesses or [],
+    )
     print(f"    Done!")
     print()
     
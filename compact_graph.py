@@ -1,5 +1,7 @@
 import heapq
-from dataclasses import dataclass
+import json
+import os
+from dataclasses import dataclass, fields
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
@@ -210,7 +212,7 @@ def build_compact_graph(G) -> CompactGraph:
             node_ids=np.array(node_ids, dtype=object),
             node_x=node_x,
             node_y=node_y,
-            indptr=np.zeros(len(node_ids) + 1, dtype=np.int64),
+            indptr=np.zeros(len(node_ids) + 1, dtype=np.int32),
             indices=empty,
             edge_length=np.array([], dtype=np.float32),
             edge_travel_time=np.array([], dtype=np.float32),
@@ -226,12 +228,12 @@ def build_compact_graph(G) -> CompactGraph:
             edge_speed_risk=np.array([], dtype=np.float32),
             edge_speed_kph=np.array([], dtype=np.float32),
             edge_optimized_weight=np.array([], dtype=np.float32),
-            edge_geom_indptr=np.zeros(1, dtype=np.int64),
+            edge_geom_indptr=np.zeros(1, dtype=np.int32),
             edge_geom_x=np.array([], dtype=np.float32),
             edge_geom_y=np.array([], dtype=np.float32),
             edge_u_idx=np.array([], dtype=np.int32),
             edge_v_idx=np.array([], dtype=np.int32),
-            edge_k=np.array([], dtype=np.int32),
+            edge_k=np.array([], dtype=np.int16),
             weights_fastest=np.array([], dtype=np.float32),
             weights_safest=np.array([], dtype=np.float32),
             node_id_to_idx=node_id_to_idx,
@@ -247,7 +249,9 @@ def build_compact_graph(G) -> CompactGraph:
 
     n = len(node_ids)
     counts = np.bincount(src_idx, minlength=n)
-    indptr = np.zeros(n + 1, dtype=np.int64)
+    # Offsets fit int32 for any city-scale graph; fall back to int64 beyond that
+    offset_dtype = np.int32 if len(src_idx) < 2**31 else np.int64
+    indptr = np.zeros(n + 1, dtype=offset_dtype)
     indptr[1:] = np.cumsum(counts)
 
     indices = dst_idx.astype(np.int32, copy=False)
@@ -280,12 +284,15 @@ def build_compact_graph(G) -> CompactGraph:
             geom_y_list.append(y)
         geom_indptr.append(len(geom_x_list))
 
-    edge_geom_indptr = np.array(geom_indptr, dtype=np.int64)
+    edge_geom_indptr = np.array(geom_indptr, dtype=np.int32 if geom_indptr[-1] < 2**31 else np.int64)
+    # float32 already stores coordinates in 4 bytes (~1 m at this latitude, finer
+    # than the 5-decimal GeoJSON output), so an int32 scale/offset encoding would
+    # not shrink the arrays any further
     edge_geom_x = np.array(geom_x_list, dtype=np.float32)
     edge_geom_y = np.array(geom_y_list, dtype=np.float32)
     edge_u_idx = _reorder(edge_u_idx, np.int32)
     edge_v_idx = _reorder(edge_v_idx, np.int32)
-    edge_k = _reorder(edge_k_list, np.int32)
+    edge_k = _reorder(edge_k_list, np.int16)
     weights_fastest = _reorder(weights_fastest, np.float32)
     weights_safest = _reorder(weights_safest, np.float32)
 
@@ -319,3 +326,65 @@ def build_compact_graph(G) -> CompactGraph:
         weights_safest=weights_safest,
         node_id_to_idx=node_id_to_idx,
     )
+
+
+_COMPACT_META_FILE = 'meta.json'
+
+
+def _array_field_names():
+    return [f.name for f in fields(CompactGraph) if f.name not in ('node_ids', 'node_id_to_idx')]
+
+
+def save_compact_graph(compact: CompactGraph, directory: str, **meta) -> None:
+    """Write each array of `compact` as an .npy file in `directory`, plus meta.json.
+
+    Extra keyword arguments must be JSON-serializable and are stored in
+    meta.json. The meta file is written last, so its presence marks a
+    complete save.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, _COMPACT_META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name in _array_field_names():
+        np.save(os.path.join(directory, f'{name}.npy'), getattr(compact, name))
+    node_ids = compact.node_ids.tolist()
+    if all(isinstance(n, int) for n in node_ids):
+        np.save(os.path.join(directory, 'node_ids.npy'), np.array(node_ids, dtype=np.int64))
+    else:
+        meta['node_ids'] = node_ids
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def load_compact_graph(directory: str, mmap_mode: Optional[str] = 'r') -> Tuple[CompactGraph, Dict]:
+    """Load a graph written by save_compact_graph(); returns (compact, meta).
+
+    With the default mmap_mode='r', arrays are read-only views of the
+    memory-mapped .npy files, so pages are only loaded as they are touched
+    and are shared between processes serving the same files.
+    """
+    with open(os.path.join(directory, _COMPACT_META_FILE)) as f:
+        meta = json.load(f)
+
+    arrays = {}
+    for name in _array_field_names():
+        path = os.path.join(directory, f'{name}.npy')
+        try:
+            arr = np.load(path, mmap_mode=mmap_mode)
+        except ValueError:
+            # Zero-length arrays can't be memory-mapped
+            arr = np.load(path)
+        # Plain ndarray views keep element access off np.memmap's Python-level __getitem__
+        arrays[name] = arr.view(np.ndarray)
+
+    if 'node_ids' in meta:
+        node_ids = meta.pop('node_ids')
+    else:
+        node_ids = np.load(os.path.join(directory, 'node_ids.npy')).tolist()
+    compact = CompactGraph(
+        node_ids=np.array(node_ids, dtype=object),
+        node_id_to_idx={nid: i for i, nid in enumerate(node_ids)},
+        **arrays,
+    )
+    return compact, meta
@@ -0,0 +1,21 @@
+"""Session-wide fixtures for the graph test scripts.
+
+The prebuilt graph and its edge arrays are loaded once per pytest session and
+shared by every test that asks for them.
+"""
+
+import pytest
+
+from graph_loader import load_graph, load_edge_arrays
+
+
+@pytest.fixture(scope='session')
+def graph_data():
+    """(G, lights, businesses, bbox) from graph_prebuilt.pkl."""
+    return load_graph()
+
+
+@pytest.fixture(scope='session')
+def edge_arrays():
+    """Per-edge arrays for the prebuilt graph (see graph_loader.load_edge_arrays)."""
+    return load_edge_arrays()
@@ -0,0 +1,93 @@
+"""Compare safest_weight formula variants on real adjacent edge pairs.
+
+The test scripts call run_formula_test() for the formula they cover; running
+this module directly checks every formula against the same pairs:
+
+    python formula_bench.py
+"""
+
+from graph_loader import load_edge_arrays, find_adjacent_pairs, edge_summary
+from weights import exponential_weight, inverse_safety_weight, danger_ratio_weight, direct_danger_weight
+
+# name -> (description, per-edge weights from the edge arrays)
+FORMULAS = {
+    'exponential': (
+        'weight = length * penalty / (safety ^ 1.5)',
+        lambda e: exponential_weight(e['length'], e['safety'], e['penalty']),
+    ),
+    'inverse_safety': (
+        'weight = length * penalty / (safety + 1)',
+        lambda e: inverse_safety_weight(e['length'], e['danger'], e['penalty']),
+    ),
+    'danger_ratio': (
+        'weight = length * penalty * danger / (safety + 0.01)',
+        lambda e: danger_ratio_weight(e['length'], e['danger'], e['penalty']),
+    ),
+    'direct_danger': (
+        'weight = length * penalty * (danger + 1) / 100',
+        lambda e: direct_danger_weight(e['length'], e['danger'], e['penalty']),
+    ),
+}
+
+
+def correct_mask(edges, weights, first, second):
+    """True where the formula prefers the lower-danger edge of each pair."""
+    danger = edges['danger']
+    return (danger[second] < danger[first]) == (weights[second] < weights[first])
+
+
+def run_formula_test(name, pairs=None, limit=10, danger_threshold=30):
+    """Print how formula `name` ranks the first `limit` adjacent pairs.
+
+    `pairs` is a find_adjacent_pairs() result to reuse; returns (correct, total).
+    """
+    edges = load_edge_arrays()
+    if pairs is None:
+        pairs = find_adjacent_pairs(edges, danger_threshold=danger_threshold, limit=limit)
+    first, second, diffs = (a[:limit] for a in pairs)
+    weights = FORMULAS[name][1](edges)
+
+    total = len(first)
+    print(f"Testing with {total} pairs of adjacent edges:\n")
+
+    correct = correct_mask(edges, weights, first, second)
+    correct_count = int(correct.sum())
+    # Build the report first and print it in one write
+    lines = []
+    for n, (i, j, danger_diff, is_correct) in enumerate(zip(first, second, diffs.tolist(), correct.tolist())):
+        u, v, danger_uv, length_uv = edge_summary(edges, i)
+        v_next, w, danger_vw, length_vw = edge_summary(edges, j)
+        weight1, weight2 = float(weights[i]), float(weights[j])
+
+        # Determine which is safer
+        safer_idx = 2 if danger_vw < danger_uv else 1
+        preferred_idx = 2 if weight2 < weight1 else 1
+        status = "✓" if is_correct else "✗"
+
+        lines.append(f"{status} Pair {n+1}: danger diff={danger_diff:.1f}")
+        lines.append(f"    Edge 1 ({u}->{v}): danger={danger_uv:.1f}, length={length_uv:.0f}m -> weight={weight1:.3f}")
+        lines.append(f"    Edge 2 ({v_next}->{w}): danger={danger_vw:.1f}, length={length_vw:.0f}m -> weight={weight2:.3f}")
+        lines.append(f"    Safer: Edge {safer_idx}, Preferred: Edge {preferred_idx}")
+        lines.append("")
+
+    if total:
+        lines.append(f"Result: {correct_count}/{total} pairs correct ({100*correct_count/total:.0f}%)")
+        print("\n".join(lines))
+    return correct_count, total
+
+
+def main():
+    edges = load_edge_arrays()
+    print(f"✓ Loaded edge arrays: {len(edges['u'])} edges\n")
+    pairs = find_adjacent_pairs(edges, danger_threshold=30)
+    first, second, _ = pairs
+    for name, (description, weight_fn) in FORMULAS.items():
+        print(f"=== {name.upper()}: {description} ===\n")
+        run_formula_test(name, pairs)
+        all_correct = int(correct_mask(edges, weight_fn(edges), first, second).sum())
+        print(f"All {len(first)} pairs: {all_correct} correct ({100*all_correct/max(len(first), 1):.1f}%)")
+        print()
+
+
+if __name__ == '__main__':
+    main()
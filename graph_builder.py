@@ -19,6 +19,7 @@ from data_fetcher import (
 )
 
 import math
+import numpy as np
 _mem_after_math = _get_mem_mb()
 print(f"[graph_builder import] After math: {_mem_after_math:.1f} MB")
 
@@ -38,6 +39,14 @@ except Exception:
 # Set SKIP_OVERPASS=1 to disable sidewalk and business data fetching
 SKIP_OVERPASS = os.environ.get('SKIP_OVERPASS', '0') == '1'
 
+# Street network, projected graph, STRtree edge index and NLCD raster only depend
+# on the bbox, so repeat builds for the same bbox reuse them (oldest entry evicted).
+# While enabled, each entry holds untouched copies of both the lat/lon and projected
+# graphs (plus the STRtree index), so at the default GRAPH_CACHE_SIZE=1 peak memory
+# roughly doubles. Set GRAPH_CACHE_SIZE=0 to disable; no graph copies are made then.
+GRAPH_CACHE_SIZE = int(os.environ.get('GRAPH_CACHE_SIZE', '1'))
+_GRAPH_CACHE = {}
+
 # --- SAFETY SCORING PARAMS FOR WALKING ROUTES ---
 # For walking, we prioritize: darkness, sidewalk availability, proximity to open businesses, land use, and speed limit
 # danger = w_darkness*darkness_score + w_sidewalk*(1-sidewalk_score) + w_business*(1-business_score) + w_land*land_risk + w_speed*speed_risk
@@ -49,6 +58,9 @@ W_LAND = 10.0
 W_SPEED = 5.0      # Speed limit risk for roads (higher speed = more dangerous)
 DENSITY_SCALE = 50.0  # scaling factor for lights per meter to darkness score
 
+# Business grid search: (dlat, dlon) cell offsets covering a 2-cell (~200m) radius
+_BIZ_OFFSETS = [(dlat, dlon) for dlat in range(-2, 3) for dlon in range(-2, 3)]
+
 
 def get_pedestrian_street_type_score(highway_value):
     """Return pedestrian friendliness score 0..1 based on OSM highway tag (higher = more pedestrian friendly).
@@ -191,6 +203,61 @@ def land_risk_from_nlcd(code):
     return risk, label
 
 
+# Lookup tables so NLCD sampling and land risk can be applied to whole arrays at once
+_PALETTE_TO_NLCD_LUT = np.full(256, -1, dtype=np.int16)
+for _palette_idx, _nlcd_code in PALETTE_TO_NLCD.items():
+    _PALETTE_TO_NLCD_LUT[_palette_idx] = _nlcd_code
+_NLCD_RISK_LUT = np.array([land_risk_from_nlcd(c)[0] for c in range(256)], dtype=np.float64)
+_NLCD_LABEL_LUT = [land_risk_from_nlcd(c)[1] for c in range(256)]
+
+
+def sample_nlcd_codes(lons, lats, raster, bounds):
+    """Vectorized `sample_nlcd_code` over arrays of lon/lat.
+
+    Returns an int array of NLCD codes with -1 wherever the point is missing (NaN),
+    outside the raster bounds, or maps to no known palette entry.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    codes = np.full(lons.shape, -1, dtype=np.int16)
+    if raster is None or bounds is None:
+        return codes
+    minx, miny, maxx, maxy = bounds
+    if raster.ndim == 3:
+        raster = raster[:, :, 0]
+    h, w = raster.shape[:2]
+    inside = (lons >= minx) & (lons <= maxx) & (lats >= miny) & (lats <= maxy)
+    x_frac = (lons[inside] - minx) / (maxx - minx) if maxx != minx else np.zeros(int(inside.sum()))
+    y_frac = (maxy - lats[inside]) / (maxy - miny) if maxy != miny else np.zeros(int(inside.sum()))
+    x_pix = (x_frac * (w - 1)).astype(np.int64)
+    y_pix = (y_frac * (h - 1)).astype(np.int64)
+    palette_idx = raster[y_pix, x_pix].astype(np.int64)
+    known = (palette_idx >= 0) & (palette_idx < _PALETTE_TO_NLCD_LUT.size)
+    sampled = np.full(palette_idx.shape, -1, dtype=np.int16)
+    sampled[known] = _PALETTE_TO_NLCD_LUT[palette_idx[known]]
+    codes[inside] = sampled
+    return codes
+
+
+def score_edges(length, light_count, sidewalk_score, business_score, land_risk, speed_risk):
+    """Vectorized walking danger score over per-edge arrays.
+
+    Returns (darkness_score, danger) arrays using the W_* weights above.
+    """
+    length = np.asarray(length, dtype=np.float64)
+    light_count = np.asarray(light_count, dtype=np.float64)
+    lights_per_meter = np.divide(light_count, length, out=np.zeros_like(length), where=length > 0)
+    darkness_score = 1.0 / (1.0 + (lights_per_meter * DENSITY_SCALE))
+    danger = (
+        (W_DARKNESS * darkness_score)
+        + (W_SIDEWALK * (1.0 - np.asarray(sidewalk_score, dtype=np.float64)))
+        + (W_BUSINESS * (1.0 - np.asarray(business_score, dtype=np.float64)))
+        + (W_LAND * np.asarray(land_risk, dtype=np.float64))
+        + (W_SPEED * np.asarray(speed_risk, dtype=np.float64))
+    )
+    return darkness_score, danger
+
+
 def get_sinuosity(u, v, G):
     """Return sinuosity ratio for edge (u, v) on graph G.
 
@@ -221,18 +288,25 @@ def build_safe_graph(bbox):
     mem_start = _get_mem_mb()
     print(f"In build_safe_graph... [mem: {mem_start:.1f} MB]")
     north, south, east, west = bbox
-    print(f"1. Downloading street network for {bbox}...")
-
-    # osmnx expects a tuple containing (west, south, east, north)
-    # Use custom filter to include walking highways AND cycleways with foot access
-    # This gets footways, paths, residential, and cycleways (excluding foot=no)
-    custom_filter = (
-        '["highway"~"footway|pedestrian|living_street|steps|track|path|residential|service|cycleway"]'
-        '["foot"!~"no"]'
-    )
-    G = graph_from_bbox((west, south, east, north), custom_filter=custom_filter, simplify=True)
+    cache_key = tuple(round(x, 6) for x in bbox)
+    cache_entry = _GRAPH_CACHE.get(cache_key)
+    cache_hit = cache_entry is not None
+    if cache_hit:
+        print(f"1. Reusing cached street network for {bbox}...")
+        G = cache_entry['G'].copy()
+    else:
+        print(f"1. Downloading street network for {bbox}...")
+
+        # osmnx expects a tuple containing (west, south, east, north)
+        # Use custom filter to include walking highways AND cycleways with foot access
+        # This gets footways, paths, residential, and cycleways (excluding foot=no)
+        custom_filter = (
+            '["highway"~"footway|pedestrian|living_street|steps|track|path|residential|service|cycleway"]'
+            '["foot"!~"no"]'
+        )
+        G = graph_from_bbox((west, south, east, north), custom_filter=custom_filter, simplify=True)
     mem_after_osm = _get_mem_mb()
-    print(f"   ✓ OSM graph downloaded: {len(G.nodes())} nodes, {len(G.edges())} edges [mem: {mem_after_osm:.1f} MB, Δ +{mem_after_osm - mem_start:.1f} MB]")
+    print(f"   ✓ OSM graph {'reused' if cache_hit else 'downloaded'}: {len(G.nodes())} nodes, {len(G.edges())} edges [mem: {mem_after_osm:.1f} MB, Δ +{mem_after_osm - mem_start:.1f} MB]")
 
     # Fetch Duke lights (list of (lat, lon))
     lights_latlon = fetch_duke_lights(bbox)
@@ -240,8 +314,19 @@ def build_safe_graph(bbox):
     print(f"   ✓ Duke lights fetched: {len(lights_latlon) if lights_latlon else 0} lights [mem: {mem_after_lights:.1f} MB, Δ +{mem_after_lights - mem_after_osm:.1f} MB]")
 
     # Project graph early to avoid scikit-learn requirement when searching
-    print("   Projecting graph for spatial operations...")
-    G_proj = project_graph(G)
+    if cache_hit:
+        G_proj = cache_entry['G_proj'].copy()
+    else:
+        print("   Projecting graph for spatial operations...")
+        G_proj = project_graph(G)
+        if GRAPH_CACHE_SIZE > 0:
+            # Keep untouched copies; G and G_proj are annotated in place below
+            cache_entry = {'G': G.copy(), 'G_proj': G_proj.copy()}
+            _GRAPH_CACHE[cache_key] = cache_entry
+            while len(_GRAPH_CACHE) > GRAPH_CACHE_SIZE:
+                _GRAPH_CACHE.pop(next(iter(_GRAPH_CACHE)))
+        else:
+            cache_entry = {}
     mem_after_proj = _get_mem_mb()
     print(f"   ✓ Graph projected [mem: {mem_after_proj:.1f} MB, Δ +{mem_after_proj - mem_after_lights:.1f} MB]")
 
@@ -256,9 +341,9 @@ def build_safe_graph(bbox):
 
         # Use a single STRtree path so each light can contribute to all nearby edges
         try:
+            import shapely
             from shapely.geometry import Point as ShapelyPoint, LineString as ShapelyLineString
             from shapely.strtree import STRtree
-            from shapely.wkb import dumps as wkb_dumps
             from pyproj import Transformer
 
             target_crs = G_proj.graph.get('crs') if isinstance(G_proj.graph, dict) else None
@@ -268,58 +353,46 @@ def build_safe_graph(bbox):
             else:
                 print("   ⚠️  No CRS found on projected graph; distances may be in degrees")
 
-            edge_keys = []
-            edge_geoms = []
-            id_to_key = {}
-            wkb_to_key = {}
-            for u, v, k, data in G_proj.edges(keys=True, data=True):
-                geom = data.get('geometry')
-                # Ensure we have a Shapely geometry; convert if needed
-                if geom is None:
-                    u_node = G_proj.nodes[u]
-                    v_node = G_proj.nodes[v]
-                    geom = ShapelyLineString([(u_node['x'], u_node['y']), (v_node['x'], v_node['y'])])
-                elif not hasattr(geom, 'geom_type'):
-                    # Attempt to coerce to Shapely geometry
-                    from shapely.geometry import shape as shapely_shape
-                    geom = shapely_shape(geom)
-                edge_keys.append((u, v, k))
-                edge_geoms.append(geom)
-                id_to_key[id(geom)] = (u, v, k)
-                try:
-                    wkb_to_key[wkb_dumps(geom)] = (u, v, k)
-                except Exception:
-                    # If serialization fails, we still have the id-based fallback
-                    pass
-
-            tree = STRtree(edge_geoms)
-            counts = {key: 0 for key in edge_keys}
+            edge_index = cache_entry.get('edge_index')
+            if edge_index is None:
+                edge_keys = []
+                edge_geoms = []
+                id_to_idx = {}  # Only needed for Shapely 1.8, whose STRtree returns geometries
+                for u, v, k, data in G_proj.edges(keys=True, data=True):
+                    geom = data.get('geometry')
+                    # Ensure we have a Shapely geometry; convert if needed
+                    if geom is None:
+                        u_node = G_proj.nodes[u]
+                        v_node = G_proj.nodes[v]
+                        geom = ShapelyLineString([(u_node['x'], u_node['y']), (v_node['x'], v_node['y'])])
+                    elif not hasattr(geom, 'geom_type'):
+                        # Attempt to coerce to Shapely geometry
+                        from shapely.geometry import shape as shapely_shape
+                        geom = shapely_shape(geom)
+                    edge_pos = len(edge_keys)
+                    edge_keys.append((u, v, k))
+                    edge_geoms.append(geom)
+                    id_to_idx[id(geom)] = edge_pos
+                edge_index = (edge_keys, edge_geoms, id_to_idx, STRtree(edge_geoms))
+                cache_entry['edge_index'] = edge_index
+            else:
+                print("   ▶ Reusing cached STRtree edge index")
+            edge_keys, edge_geoms, id_to_idx, tree = edge_index
+            # Edge positions hit by each light; tallied with np.bincount below
+            light_hits = []
 
             # Quick diagnostic: sample a few lights to see min distance to any edge
+            # (one vectorized nearest query; requires Shapely 2.x)
             try:
-                sample_lights = lights_latlon[:50]
-                min_dists = []
-                for lat, lon in sample_lights:
-                    if transformer:
-                        x, y = transformer.transform(lon, lat)
-                        light_pt = ShapelyPoint(x, y)
-                    else:
-                        light_pt = ShapelyPoint(lon, lat)
-                    nearest_geom = tree.nearest(light_pt)
-                    if nearest_geom is not None:
-                        # Shapely may return either a geometry or an index depending on version
-                        if not hasattr(nearest_geom, 'geom_type'):
-                            try:
-                                nearest_geom = edge_geoms[int(nearest_geom)]
-                            except Exception:
-                                nearest_geom = None
-                        if nearest_geom is not None and hasattr(nearest_geom, 'geom_type'):
-                            try:
-                                min_dists.append(light_pt.distance(nearest_geom))
-                            except Exception:
-                                continue
-                if min_dists:
-                    print(f"   ▶ Min/median/mean distance of sample lights to edges: {min(min_dists):.2f} / {sorted(min_dists)[len(min_dists)//2]:.2f} / {(sum(min_dists)/len(min_dists)):.2f} (CRS units)")
+                sample_lights = np.asarray(lights_latlon[:50], dtype=np.float64)
+                sample_xs, sample_ys = sample_lights[:, 1], sample_lights[:, 0]
+                if transformer:
+                    sample_xs, sample_ys = transformer.transform(sample_xs, sample_ys)
+                sample_pts = shapely.points(sample_xs, sample_ys)
+                nearest_idx = tree.nearest(sample_pts)
+                min_dists = shapely.distance(sample_pts, np.asarray(edge_geoms, dtype=object)[nearest_idx])
+                if min_dists.size:
+                    print(f"   ▶ Min/median/mean distance of sample lights to edges: {np.min(min_dists):.2f} / {np.median(min_dists):.2f} / {np.mean(min_dists):.2f} (CRS units)")
             except Exception as diag_err:
                 print(f"   ⚠️  Distance diagnostic failed: {diag_err}")
 
@@ -344,43 +417,45 @@ def build_safe_graph(bbox):
                     print(f"   ⚠️  STRtree query error for one light: {q_err}")
                     continue
                 for candidate in candidates:
-                    geom = candidate
-                    if not hasattr(geom, 'geom_type'):
-                        try:
-                            geom = edge_geoms[int(candidate)]
-                        except Exception:
+                    if hasattr(candidate, 'geom_type'):
+                        # Shapely 1.8 returns geometries; map back to the edge position
+                        edge_pos = id_to_idx.get(id(candidate))
+                        if edge_pos is None:
                             continue
+                    else:
+                        # Shapely 2.x returns integer indices into edge_geoms
+                        edge_pos = int(candidate)
                     try:
-                        if light_pt.distance(geom) <= LIGHT_PROXIMITY_THRESHOLD_M:
-                            key = id_to_key.get(id(geom))
-                            if not key:
-                                try:
-                                    key = wkb_to_key.get(wkb_dumps(geom))
-                                except Exception:
-                                    key = None
-                            if key:
-                                counts[key] = counts.get(key, 0) + 1
+                        if light_pt.distance(edge_geoms[edge_pos]) <= LIGHT_PROXIMITY_THRESHOLD_M:
+                            light_hits.append(edge_pos)
                     except Exception:
                         # Skip any bad geometry
                         continue
 
-            for (u, v, k), cnt in counts.items():
+            counts_arr = np.bincount(np.asarray(light_hits, dtype=np.int64), minlength=len(edge_keys))
+            for (u, v, k), cnt in zip(edge_keys, counts_arr.tolist()):
                 if G_proj.has_edge(u, v, k):
                     G_proj.edges[u, v, k]['light_count'] = cnt
 
             print(f"   ✓ Counted lights with STRtree proximity ({LIGHT_PROXIMITY_THRESHOLD_M}m) allowing multi-edge attribution")
             
-            # Clean up spatial structures to free memory
+            # Release local refs to the spatial structures; when this bbox is cached the
+            # STRtree edge index stays alive in _GRAPH_CACHE for the next build
+            index_cached = _GRAPH_CACHE.get(cache_key) is cache_entry
+            if not index_cached:
+                cache_entry.pop('edge_index', None)
             mem_before_cleanup = _get_mem_mb()
-            del tree, edge_geoms, edge_keys, id_to_key, wkb_to_key, counts
+            del tree, edge_geoms, edge_keys, id_to_idx, light_hits, edge_index
             mem_after_cleanup = _get_mem_mb()
-            print(f"   ✓ Cleaned up STRtree structures [mem: {mem_after_cleanup:.1f} MB, Δ {mem_after_cleanup - mem_before_cleanup:.1f} MB]")
+            if index_cached:
+                print(f"   ✓ Released local STRtree refs; spatial index kept in _GRAPH_CACHE [mem: {mem_after_cleanup:.1f} MB, Δ {mem_after_cleanup - mem_before_cleanup:.1f} MB]")
+            else:
+                print(f"   ✓ Cleaned up STRtree structures [mem: {mem_after_cleanup:.1f} MB, Δ {mem_after_cleanup - mem_before_cleanup:.1f} MB]")
 
             # quick stats to verify lights applied
-            edge_counts = [d.get('light_count', 0) for _, _, _, d in G_proj.edges(keys=True, data=True)]
-            lit_edges = sum(1 for c in edge_counts if c > 0)
-            max_lights = max(edge_counts) if edge_counts else 0
-            print(f"   ▶ Lit edges: {lit_edges}/{len(edge_counts)} (max lights on an edge: {max_lights})")
+            lit_edges = int((counts_arr > 0).sum())
+            max_lights = int(counts_arr.max() if counts_arr.size else 0)
+            print(f"   ▶ Lit edges: {lit_edges}/{counts_arr.size} (max lights on an edge: {max_lights})")
 
         except Exception as e:
             print(f"   ⚠️  Proximity check failed: {e} — setting all light counts to 0")
@@ -404,8 +479,13 @@ def build_safe_graph(bbox):
     print(f"   Graph before scoring: {len(G_proj.nodes())} nodes, {len(G_proj.edges())} edges")
 
     # Fetch NLCD raster once for bbox
-    print("   Fetching NLCD land cover raster for bbox once...")
-    nlcd_raster, nlcd_bounds = fetch_nlcd_raster(bbox)
+    if 'nlcd' in cache_entry:
+        print("   Reusing cached NLCD land cover raster...")
+        nlcd_raster, nlcd_bounds = cache_entry['nlcd']
+    else:
+        print("   Fetching NLCD land cover raster for bbox once...")
+        nlcd_raster, nlcd_bounds = fetch_nlcd_raster(bbox)
+        cache_entry['nlcd'] = (nlcd_raster, nlcd_bounds)
     mem_after_nlcd = _get_mem_mb()
     if nlcd_raster is None or nlcd_bounds is None:
         print("   ⚠️ NLCD raster unavailable; using default land risk")
@@ -480,27 +560,45 @@ def build_safe_graph(bbox):
                 print(f"     {name}: lat={lat:.6f} lon={lon:.6f} reviews={review_count} -> cell=({cell_lat}, {cell_lon})")
         print(f"   DEBUG: Total business grid cells: {len(business_locations)}")
 
+    # Every cell with at least one business within the search radius, so edges
+    # far from any business skip the per-offset probing entirely
+    business_reach = frozenset(
+        (cell_lat + dlat, cell_lon + dlon)
+        for cell_lat, cell_lon in business_locations
+        for dlat, dlon in _BIZ_OFFSETS
+    )
+
     # Scoring: safety = w_darkness*darkness_score + w_sidewalk*sidewalk_score + w_business*business_score + w_land*land_risk
     print("   Scoring edges for walking safety...")
-    land_samples = 0
-    land_unknown = 0
-    land_codes = []
-    edge_idx = 0  # Counter for debug output
+    # AoS -> SoA: take the edge dicts once and pull the numeric fields into
+    # contiguous arrays; the numeric scoring itself runs once over the arrays
+    # (score_edges / sample_nlcd_codes) after the per-edge pass below.
+    uv_keys = []
+    edge_datas = []
     for u, v, k, data in G_proj.edges(keys=True, data=True):
-        # Darkness score from lights per meter (higher when darker)
-        length_m = data.get('length', 0.0)
-        if not length_m or length_m <= 0:
-            # fall back to geometry length if available
-            geom = data.get('geometry')
-            try:
-                if geom is not None and hasattr(geom, 'length'):
-                    length_m = float(geom.length)
-            except Exception:
-                length_m = 0.0
-        light_count = float(data.get('light_count', 0))
-        lights_per_meter = (light_count / length_m) if length_m and length_m > 0 else 0.0
-        darkness_score = 1.0 / (1.0 + (lights_per_meter * DENSITY_SCALE))
-
+        uv_keys.append((u, v, k))
+        edge_datas.append(data)
+    num_edges = len(edge_datas)
+    length_arr = np.fromiter((d.get('length', 0.0) or 0.0 for d in edge_datas), dtype=np.float64, count=num_edges)
+    light_count_arr = np.fromiter((d.get('light_count', 0) for d in edge_datas), dtype=np.float64, count=num_edges)
+    travel_time_arr = np.fromiter((d['travel_time'] for d in edge_datas), dtype=np.float64, count=num_edges)
+    # Length for lights-per-meter darkness: fall back to geometry length if available
+    for i in np.flatnonzero(length_arr <= 0).tolist():
+        geom = edge_datas[i].get('geometry')
+        try:
+            if geom is not None and hasattr(geom, 'length'):
+                length_arr[i] = float(geom.length)
+        except Exception:
+            length_arr[i] = 0.0
+
+    sample_land = transformer_to_latlon is not None and nlcd_raster is not None and nlcd_bounds is not None
+    sidewalk_arr = np.zeros(num_edges, dtype=np.float64)
+    business_arr = np.full(num_edges, 0.5, dtype=np.float64)
+    speed_risk_arr = np.zeros(num_edges, dtype=np.float64)
+    road_penalty_arr = np.ones(num_edges, dtype=np.float64)
+    mid_lon_arr = np.full(num_edges, np.nan, dtype=np.float64)
+    mid_lat_arr = np.full(num_edges, np.nan, dtype=np.float64)
+    for edge_idx, ((u, v, k), data) in enumerate(zip(uv_keys, edge_datas)):
         # Pedestrian infrastructure: BINARY classification
         # Either it's a dedicated footpath (1.0) or it's a road (0.0)
         # This forces routing to prefer footpaths over roads
@@ -532,24 +630,30 @@ def build_safe_graph(bbox):
         # Store explicit sidewalk flag for overlay filtering
         data['has_explicit_sidewalk'] = has_explicit_sidewalk
         
-        # Business proximity score: higher when near ANY business (feels safer)
-        business_score = 0.5  # Default neutral
-        business_count = 0
-        business_name = None
-        if business_locations:  # Only check if we have businesses
+        # Edge midpoint in lon/lat, shared by business matching and land cover sampling
+        geom = data.get('geometry')
+        lon = lat = None
+        if business_locations or sample_land:
             try:
-                geom = data.get('geometry')
                 if geom is not None and hasattr(geom, 'interpolate'):
                     mid_pt = geom.interpolate(0.5, normalized=True)
-                    # Transform from projected coords (x,y) to lon/lat for business matching
-                    lon, lat = transformer_to_latlon.transform(mid_pt.x, mid_pt.y) if transformer_to_latlon else (mid_pt.x, mid_pt.y)
+                    midx, midy = mid_pt.x, mid_pt.y
                 else:
                     # Nodes in G_proj are in projected coordinates, must transform to lon/lat
                     x1, y1 = G_proj.nodes[u]['x'], G_proj.nodes[u]['y']
                     x2, y2 = G_proj.nodes[v]['x'], G_proj.nodes[v]['y']
                     midx, midy = (x1 + x2) / 2.0, (y1 + y2) / 2.0
-                    lon, lat = transformer_to_latlon.transform(midx, midy) if transformer_to_latlon else (midx, midy)
-                
+                lon, lat = transformer_to_latlon.transform(midx, midy) if transformer_to_latlon else (midx, midy)
+            except Exception:
+                lon = lat = None
+
+        # Business proximity score: higher when near ANY business (feels safer)
+        business_score = 0.5  # Default neutral
+        business_count = 0
+        business_name = None
+        nearby_businesses = False
+        if business_locations and lat is not None:  # Only check if we have businesses
+            try:
                 # Check business proximity (within ~200m / ~2 grid cells)
                 # 1000 * lat/lon gives ~111m precision per unit
                 cell_lat = round(lat * 1000)
@@ -563,9 +667,10 @@ def build_safe_graph(bbox):
                 total_matches = 0
                 sample_name = None
                 
-                # Search in a 2-cell radius (~200m) and count all businesses
-                for dlat in range(-2, 3):
-                    for dlon in range(-2, 3):
+                # Search in a 2-cell radius (~200m) and count all businesses.
+                # Cells with nothing in reach are rejected with a single set probe.
+                if (cell_lat, cell_lon) in business_reach:
+                    for dlat, dlon in _BIZ_OFFSETS:
                         key = (cell_lat + dlat, cell_lon + dlon)
                         if key in business_locations:
                             biz_list = business_locations.get(key, [])
@@ -656,37 +761,17 @@ def build_safe_graph(bbox):
         
         data['speed_risk'] = speed_risk
 
-        # Land cover risk from NLCD raster at midpoint
-        land_risk = 0.6
-        land_label = "Unknown"
-        if transformer_to_latlon is not None and nlcd_raster is not None and nlcd_bounds is not None:
-            try:
-                geom = data.get('geometry')
-                if geom is not None and hasattr(geom, 'interpolate'):
-                    mid_pt = geom.interpolate(0.5, normalized=True)
-                    lon, lat = transformer_to_latlon.transform(mid_pt.x, mid_pt.y)
-                else:
-                    lon1, lat1 = G_proj.nodes[u]['x'], G_proj.nodes[u]['y']
-                    lon2, lat2 = G_proj.nodes[v]['x'], G_proj.nodes[v]['y']
-                    midx, midy = (lon1 + lon2) / 2.0, (lat1 + lat2) / 2.0
-                    lon, lat = transformer_to_latlon.transform(midx, midy)
-
-                code = sample_nlcd_code(lon, lat, nlcd_raster, nlcd_bounds)
-                lr, lbl = land_risk_from_nlcd(code)
-                land_risk = lr
-                land_label = lbl
-                land_samples += 1
-                if code is None:
-                    land_unknown += 1
-                else:
-                    land_codes.append(code)
-            except Exception:
-                pass
+        # Land cover midpoint (lon/lat) for NLCD sampling after the loop
+        if sample_land and lat is not None:
+            mid_lon_arr[edge_idx] = lon
+            mid_lat_arr[edge_idx] = lat
+
+        sidewalk_arr[edge_idx] = sidewalk_score
+        business_arr[edge_idx] = business_score
+        speed_risk_arr[edge_idx] = speed_risk
+        # CRITICAL: Heavily penalize roads to force footpath routing (10x penalty for roads)
+        road_penalty_arr[edge_idx] = 1.0 if is_footpath else 10.0
 
-        # Calculate walking DANGER score (higher = MORE dangerous)
-        # Invert components so higher values mean more dangerous
-        danger = (W_DARKNESS * darkness_score) + (W_SIDEWALK * (1.0 - sidewalk_score)) + (W_BUSINESS * (1.0 - business_score)) + (W_LAND * land_risk) + (W_SPEED * speed_risk)
-        data['darkness_score'] = darkness_score
         data['sidewalk_score'] = sidewalk_score
         data['business_score'] = business_score
         data['business_count'] = int(business_count) if 'business_count' in locals() else 0
@@ -702,40 +787,58 @@ def build_safe_graph(bbox):
                 all_hours = []
                 cell_lat = round(lat * 1000)
                 cell_lon = round(lon * 1000)
-                for dlat in range(-2, 3):
-                    for dlon in range(-2, 3):
-                        key = (cell_lat + dlat, cell_lon + dlon)
-                        if key in business_locations:
-                            for biz_info in business_locations[key]:
-                                if isinstance(biz_info, tuple) and len(biz_info) >= 2:
-                                    name, hours = biz_info[0], biz_info[1]
-                                    if hours:
-                                        all_hours.extend(hours)
+                for dlat, dlon in _BIZ_OFFSETS:
+                    key = (cell_lat + dlat, cell_lon + dlon)
+                    if key in business_locations:
+                        for biz_info in business_locations[key]:
+                            if isinstance(biz_info, tuple) and len(biz_info) >= 2:
+                                name, hours = biz_info[0], biz_info[1]
+                                if hours:
+                                    all_hours.extend(hours)
                 data['business_hours'] = all_hours[:14] if all_hours else []  # Store first 14 lines (2 weeks)
             except Exception:
                 data['business_hours'] = []
         else:
             data['business_hours'] = []
-        data['land_risk'] = land_risk
-        data['land_label'] = land_label
         data['speed_risk'] = speed_risk
-        data['danger_score'] = float(danger)
-        
-        # CRITICAL: Heavily penalize roads to force footpath routing
-        # Use inverted danger for routing weight (lower danger = lower weight)
-        # Multiply by road_penalty, then divide by safety (inverted danger)
-        road_penalty = 1.0 if is_footpath else 10.0  # 10x penalty for roads
-        safety_for_routing = 100.0 - danger  # Invert danger to safety for routing
-        data['optimized_weight'] = data['travel_time'] * road_penalty / (safety_for_routing + 0.01)
-        
-        edge_idx += 1  # Increment counter
+
+    # Land cover risk from NLCD raster at each midpoint (one vectorized lookup)
+    land_sampled = ~np.isnan(mid_lon_arr)
+    nlcd_codes = sample_nlcd_codes(mid_lon_arr, mid_lat_arr, nlcd_raster, nlcd_bounds)
+    land_risk_arr = np.where(nlcd_codes >= 0, _NLCD_RISK_LUT[nlcd_codes], 0.6)
+
+    # Calculate walking DANGER score (higher = MORE dangerous)
+    darkness_arr, danger_arr = score_edges(
+        length_arr, light_count_arr, sidewalk_arr, business_arr, land_risk_arr, speed_risk_arr
+    )
+    # Use inverted danger for routing weight (lower danger = lower weight):
+    # multiply by road_penalty, then divide by safety (inverted danger)
+    optimized_arr = travel_time_arr * road_penalty_arr / ((100.0 - danger_arr) + 0.01)
+
+    for data, code, land_risk, darkness_score, danger, optimized_weight in zip(
+        edge_datas,
+        nlcd_codes.tolist(),
+        land_risk_arr.tolist(),
+        darkness_arr.tolist(),
+        danger_arr.tolist(),
+        optimized_arr.tolist(),
+    ):
+        data['darkness_score'] = darkness_score
+        data['land_risk'] = land_risk
+        data['land_label'] = _NLCD_LABEL_LUT[code] if code >= 0 else "Unknown"
+        data['danger_score'] = danger
+        data['optimized_weight'] = optimized_weight
 
     # Debug summary for land cover sampling
     mem_after_scoring = _get_mem_mb()
+    land_samples = int(land_sampled.sum())
     if land_samples == 0:
         print("   ⚠️ No NLCD samples were taken (raster or transform missing)")
     else:
-        uniq = {c: land_codes.count(c) for c in set(land_codes)} if land_codes else {}
+        sampled_codes = nlcd_codes[land_sampled]
+        land_unknown = int((sampled_codes < 0).sum())
+        seen, seen_counts = np.unique(sampled_codes[sampled_codes >= 0], return_counts=True)
+        uniq = dict(zip(seen.tolist(), seen_counts.tolist()))
         print(f"   ▶ NLCD samples: {land_samples} (unknown: {land_unknown}) codes_seen: {uniq}")
     
     # Statistics on footpath vs road coverage
@@ -792,18 +895,22 @@ def build_safe_graph(bbox):
     # Note: optimized_weight already calculated at line 723 with proper road penalty
     # Don't recalculate here - the formula with 10x road penalty is correct
 
-    # Return graph in lat/lon for plotting and routing convenience
-    mem_before_reproject = _get_mem_mb()
-    G_latlon = project_graph(G_proj, to_crs='EPSG:4326')
-    mem_after_reproject = _get_mem_mb()
-    print(f"   ✓ Graph re-projected to lat/lon [mem: {mem_after_reproject:.1f} MB, Δ +{mem_after_reproject - mem_before_reproject:.1f} MB]")
+    # Return graph in lat/lon for plotting and routing convenience.
+    # The downloaded G is already in EPSG:4326, so copy the scored attributes
+    # onto it instead of re-projecting G_proj (keeps G's lat/lon geometry).
+    mem_before_copy = _get_mem_mb()
+    for u, v, k, data in G_proj.edges(keys=True, data=True):
+        if G.has_edge(u, v, k):
+            G.edges[u, v, k].update({key: val for key, val in data.items() if key != 'geometry'})
+    G_latlon = G
+    mem_after_copy = _get_mem_mb()
+    print(f"   ✓ Scores copied onto lat/lon graph [mem: {mem_after_copy:.1f} MB, Δ +{mem_after_copy - mem_before_copy:.1f} MB]")
     
-    # Clean up intermediate copies to free memory
+    # Clean up the projected copy to free memory
     mem_before_graph_del = _get_mem_mb()
     del G_proj
-    del G
     mem_after_graph_del = _get_mem_mb()
-    print(f"   ✓ Intermediate graphs released [mem: {mem_after_graph_del:.1f} MB, Δ {mem_after_graph_del - mem_before_graph_del:.1f} MB]")
+    print(f"   ✓ Projected graph released [mem: {mem_after_graph_del:.1f} MB, Δ {mem_after_graph_del - mem_before_graph_del:.1f} MB]")
     
     mem_final = _get_mem_mb()
     print(f"   ✓ Build complete [final mem: {mem_final:.1f} MB, total Δ +{mem_final - mem_start:.1f} MB]")
@@ -819,7 +926,7 @@ if __name__ == '__main__':
         output_file = 'graph_prebuilt.pkl'
         print(f"[graph_builder] Saving to {output_file}...")
         with open(output_file, 'wb') as f:
-            pickle.dump((G_latlon, lights_latlon, businesses, BBOX), f)
+            pickle.dump((G_latlon, lights_latlon, businesses, BBOX), f, protocol=5)
         print("[graph_builder] Save complete.")
         print(
             f"[graph_builder] Done. nodes={len(G_latlon.nodes())} edges={len(G_latlon.edges())} "
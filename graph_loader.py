@@ -0,0 +1,171 @@
+"""Shared loader for graph_prebuilt.pkl used by the test scripts.
+
+The unpickled graph is memoized per process, and the per-edge fields the
+tests compare (endpoints, length, danger, sidewalk) are cached on disk as
+flat arrays in graph_prebuilt.npz so later runs can skip the graph walk.
+Edges are kept in G.edges order, which groups them by source node, so the
+arrays double as a CSR adjacency: the out-edges of node index n are the
+edge ids indptr[n]:indptr[n + 1].
+"""
+
+import functools
+import os
+import pickle
+
+import numpy as np
+
+from weights import road_penalty
+
+GRAPH_PKL = 'graph_prebuilt.pkl'
+EDGE_ARRAYS_NPZ = 'graph_prebuilt.npz'
+# Narrowest dtype that holds each field without loss: parallel-edge keys are tiny,
+# sidewalk scores are 0/1 flags, danger keeps float32 because scores are fractional
+# and the >= 30 pair threshold and printed values depend on them.
+_EDGE_ARRAY_DTYPES = {
+    'u': np.int64,
+    'v': np.int64,
+    'key': np.uint8,
+    'v_idx': np.int32,
+    'indptr': np.int32,
+    'length': np.float32,
+    'danger': np.float32,
+    'sidewalk': np.float16,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def load_graph(path=GRAPH_PKL):
+    """Unpickle the prebuilt graph once per process.
+
+    Returns (G, lights, businesses, bbox); businesses is None for old 3-tuple pickles.
+    """
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    if len(data) == 4:
+        return tuple(data)
+    G, lights, bbox = data
+    return G, lights, None, bbox
+
+
+def _edge_arrays_from_graph(G):
+    """Walk G.edges once into flat arrays (in G.edges order) plus CSR offsets."""
+    node_id = {n: i for i, n in enumerate(G.nodes())}
+    indptr = np.zeros(len(node_id) + 1, dtype=_EDGE_ARRAY_DTYPES['indptr'])
+    for n, out_degree in G.out_degree():
+        indptr[node_id[n] + 1] = out_degree
+    np.cumsum(indptr, out=indptr)
+    m = G.number_of_edges()
+    dtypes = _EDGE_ARRAY_DTYPES
+    u_arr = np.empty(m, dtype=dtypes['u'])
+    v_arr = np.empty(m, dtype=dtypes['v'])
+    key_arr = np.empty(m, dtype=dtypes['key'])
+    v_idx_arr = np.empty(m, dtype=dtypes['v_idx'])
+    length_arr = np.empty(m, dtype=dtypes['length'])
+    danger_arr = np.empty(m, dtype=dtypes['danger'])
+    sidewalk_arr = np.empty(m, dtype=dtypes['sidewalk'])
+    for i, (u, v, k, data) in enumerate(G.edges(keys=True, data=True)):
+        u_arr[i] = u
+        v_arr[i] = v
+        key_arr[i] = k
+        v_idx_arr[i] = node_id[v]
+        length_arr[i] = data.get('length', 1)
+        danger_arr[i] = data.get('danger_score', 50)
+        sidewalk_arr[i] = data.get('sidewalk_score', 0)
+    return {
+        'u': u_arr,
+        'v': v_arr,
+        'key': key_arr,
+        'v_idx': v_idx_arr,
+        'indptr': indptr,
+        'length': length_arr,
+        'danger': danger_arr,
+        'sidewalk': sidewalk_arr,
+    }
+
+
+def _add_static_weight_terms(arrays):
+    """Precompute the per-edge terms every safest_weight variant shares."""
+    arrays['penalty'] = road_penalty(arrays['sidewalk']).astype(np.float32)
+    arrays['safety'] = np.maximum(1.0, 100.0 - arrays['danger'].astype(np.float64))
+    return arrays
+
+
+@functools.lru_cache(maxsize=None)
+def load_edge_arrays(path=GRAPH_PKL, cache_path=EDGE_ARRAYS_NPZ):
+    """Per-edge arrays for the prebuilt graph, read from the .npz cache when fresh.
+
+    The cache is rebuilt from the pickle whenever the pickle is newer. Besides the
+    raw fields, 'penalty' (road penalty) and 'safety' (max(1, 100 - danger)) are
+    filled in once here so the weight formulas don't re-derive them.
+    """
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        with np.load(cache_path) as cached:
+            if set(_EDGE_ARRAY_DTYPES) <= set(cached.files):
+                return _add_static_weight_terms({
+                    name: cached[name].astype(dtype, copy=False)
+                    for name, dtype in _EDGE_ARRAY_DTYPES.items()
+                })
+    G = load_graph(path)[0]
+    arrays = _edge_arrays_from_graph(G)
+    try:
+        np.savez(cache_path, **arrays)
+    except OSError as e:
+        print(f"⚠️  Could not write {cache_path}: {e}")
+    return _add_static_weight_terms(arrays)
+
+
+@functools.lru_cache(maxsize=None)
+def load_edge_data(path=GRAPH_PKL):
+    """Edge attribute dicts in G.edges order, aligned with load_edge_arrays()."""
+    G = load_graph(path)[0]
+    return [data for _, _, data in G.edges(data=True)]
+
+
+def iter_adjacent_pairs(edges, danger_threshold=30, block_size=1024):
+    """Yield adjacent edge pairs (u->v, v->w) whose danger differs by at least danger_threshold.
+
+    Expands each edge u->v into the CSR slice of v's out-edges, one block of
+    `block_size` first edges at a time. Yields (first, second, danger_diff)
+    array triples; first/second are edge ids, in the same order as the nested
+    G.edges / G.out_edges(v) walk.
+    """
+    indptr, v_idx, danger = edges['indptr'], edges['v_idx'], edges['danger']
+    for start in range(0, len(v_idx), block_size):
+        block_v = v_idx[start:start + block_size]
+        lo = indptr[block_v]
+        counts = indptr[block_v + 1] - lo
+        first = start + np.repeat(np.arange(len(block_v)), counts)
+        # Offset of each pair within its successor slice
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = np.repeat(lo, counts) + offsets
+        danger_diff = np.abs(danger[first] - danger[second])
+        mask = danger_diff >= danger_threshold
+        if mask.any():
+            yield first[mask], second[mask], danger_diff[mask]
+
+
+def find_adjacent_pairs(edges, danger_threshold=30, limit=None):
+    """Collect iter_adjacent_pairs() into (first, second, danger_diff) arrays.
+
+    With `limit`, stops scanning as soon as that many pairs are found.
+    """
+    blocks = []
+    found = 0
+    for block in iter_adjacent_pairs(edges, danger_threshold):
+        blocks.append(block)
+        found += len(block[0])
+        if limit is not None and found >= limit:
+            break
+    if not blocks:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, edges['danger'].dtype)
+    return tuple(np.concatenate(parts)[:limit] for parts in zip(*blocks))
+
+
+def edge_summary(edges, i):
+    """(u, v, danger, length) for edge index i as plain Python values."""
+    return (
+        int(edges['u'][i]),
+        int(edges['v'][i]),
+        float(edges['danger'][i]),
+        float(edges['length'][i]),
+    )
@@ -0,0 +1,35 @@
+"""
+Concurrent /api/routes requests with different departure times must each be
+scored against their own departure time's business scores, not a mix of both.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import web_app
+
+START = [35.78, -78.64]
+END = [35.775, -78.66]
+DEPARTURES = ['2026-01-20T14:30:00Z', '2026-01-21T08:00:00Z']
+
+
+def _safety_scores(client, departure_time):
+    data = client.post('/api/routes', json={
+        'start': START, 'end': END, 'departure_time': departure_time,
+    }).get_json()
+    return data['fastest']['data']['safety_score'], data['safest']['data']['safety_score']
+
+
+def test_concurrent_departure_times():
+    client = web_app.app.test_client()
+    expected = {t: _safety_scores(client, t) for t in DEPARTURES}
+    assert expected[DEPARTURES[0]] != expected[DEPARTURES[1]]
+    print(f"✓ Sequential safety scores: {expected}")
+
+    # Alternate departure times so every request forces a recompute while others route
+    requests = DEPARTURES * 12
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda t: _safety_scores(web_app.app.test_client(), t), requests))
+
+    mismatches = [(t, got) for t, got in zip(requests, results) if got != expected[t]]
+    print(f"Concurrent requests: {len(requests)}, mismatches: {len(mismatches)}")
+    assert not mismatches
@@ -1,5 +1,7 @@
 """Test the updated safest_weight formula."""
 
+from weights import EXAMPLE_DANGERS, ROAD_PENALTY, inverse_safety_weight
+
 def test_updated_formula():
     """Test the new simplified formula"""
     
@@ -35,10 +37,10 @@ def test_updated_formula():
     
     # Test the scale
     print("Test 3: Weight scaling across danger range")
-    for d in [5, 20, 44, 60, 80, 95]:
-        safety = 100 - d
-        weight = (100 * 10) / (safety + 1.0)
-        print(f"  danger={d:2d}: safety={safety:2d}, weight={weight:7.2f}")
+    safety = 100 - EXAMPLE_DANGERS
+    weights = inverse_safety_weight(100, EXAMPLE_DANGERS, ROAD_PENALTY)
+    for d, s, weight in zip(EXAMPLE_DANGERS.tolist(), safety.tolist(), weights.tolist()):
+        print(f"  danger={d:2d}: safety={s:2d}, weight={weight:7.2f}")
     
     print("\nTest 4: Footpath vs Road with same danger")
     danger_val = 50
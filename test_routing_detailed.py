@@ -1,23 +1,15 @@
 """More detailed test to debug the safe routing issue."""
 
-import pickle
-import networkx as nx
+from graph_loader import load_edge_arrays, edge_summary
+from weights import EXAMPLE_DANGERS, ROAD_PENALTY, danger_ratio_weight
+import numpy as np
 
-def test_specific_scenario():
+def test_routing_detailed(edge_arrays):
     """Test the exact scenario from the user: danger 44 vs danger 5"""
     
-    # Load the prebuilt graph
-    try:
-        with open('graph_prebuilt.pkl', 'rb') as f:
-            data = pickle.load(f)
-            if len(data) == 4:
-                G, lights, businesses, bbox = data
-            else:
-                G, lights, bbox = data
-        print(f"✓ Loaded graph: {len(G.nodes())} nodes, {len(G.edges())} edges\n")
-    except Exception as e:
-        print(f"✗ Failed to load graph: {e}")
-        return False
+    # Prebuilt graph's edge arrays, loaded once per session (see conftest.py)
+    edges = edge_arrays
+    print(f"✓ Loaded graph: {len(edges['indptr']) - 1} nodes, {len(edges['u'])} edges\n")
     
     # Weight function from web_app.py
     def safest_weight(u, v, edge_data):
@@ -69,42 +61,34 @@ def test_specific_scenario():
     
     # Check if there are any edges with danger exactly 44 and 5
     print("=== TEST 4: Finding real edges with danger ~44 and ~5 ===")
-    edges_near_44 = []
-    edges_near_5 = []
+    danger_arr = edges['danger']
+    edges_near_44 = np.flatnonzero((danger_arr >= 43) & (danger_arr <= 45))
+    edges_near_5 = np.flatnonzero((danger_arr >= 4) & (danger_arr <= 6))
     
-    for u, v, k, data in G.edges(keys=True, data=True):
-        danger = data.get('danger_score', 50)
-        if 43 <= danger <= 45:
-            edges_near_44.append((u, v, k, data, danger))
-        elif 4 <= danger <= 6:
-            edges_near_5.append((u, v, k, data, danger))
+    print(f"Found {edges_near_44.size} edges with danger ~44")
+    print(f"Found {edges_near_5.size} edges with danger ~5")
     
-    print(f"Found {len(edges_near_44)} edges with danger ~44")
-    print(f"Found {len(edges_near_5)} edges with danger ~5")
-    
-    if edges_near_44 and edges_near_5:
+    if edges_near_44.size and edges_near_5.size:
         print("\nExample edge with danger ~44:")
-        u, v, k, data, danger = edges_near_44[0]
-        length = data.get('length', 0)
-        sidewalk = data.get('sidewalk_score', 0)
-        print(f"  Edge {u}->{v}: danger={danger:.1f}, length={length:.0f}m, sidewalk={sidewalk:.2f}")
+        i = edges_near_44[0]
+        u, v, danger, length = edge_summary(edges, i)
+        print(f"  Edge {u}->{v}: danger={danger:.1f}, length={length:.0f}m, sidewalk={edges['sidewalk'][i]:.2f}")
         
         print("\nExample edge with danger ~5:")
-        u, v, k, data, danger = edges_near_5[0]
-        length = data.get('length', 0)
-        sidewalk = data.get('sidewalk_score', 0)
-        print(f"  Edge {u}->{v}: danger={danger:.1f}, length={length:.0f}m, sidewalk={sidewalk:.2f}")
+        i = edges_near_5[0]
+        u, v, danger, length = edge_summary(edges, i)
+        print(f"  Edge {u}->{v}: danger={danger:.1f}, length={length:.0f}m, sidewalk={edges['sidewalk'][i]:.2f}")
     
     # Analyze the formula more carefully
     print("\n=== FORMULA ANALYSIS ===")
     print("Current formula: weight = length * road_penalty * (danger / (100 - danger + 0.01))")
     print("\nWith danger increasing from 5 to 95:")
-    for d in [5, 20, 44, 60, 80, 95]:
-        w = 100 * 10 * (d / (100.0 - d + 0.01))
+    weights = danger_ratio_weight(100, EXAMPLE_DANGERS, ROAD_PENALTY)
+    for d, w in zip(EXAMPLE_DANGERS.tolist(), weights.tolist()):
         print(f"  danger={d:2d}: weight={w:8.2f}")
     
     print("\nThis shows that higher danger = higher weight, which is CORRECT")
     print("The algorithm should prefer low-weight edges, so it SHOULD prefer safe roads")
 
 if __name__ == '__main__':
-    test_specific_scenario()
+    test_routing_detailed(load_edge_arrays())
@@ -4,36 +4,17 @@ This test demonstrates that the routing algorithm correctly prioritizes
 safer paths over dangerous paths, even when they're slightly longer.
 """
 
-import pickle
+from graph_loader import load_graph
+from formula_bench import run_formula_test
 
-def main():
+def test_safe_routing_final(graph_data):
     print("=" * 70)
     print("SAFE ROUTING FIX VALIDATION TEST")
     print("=" * 70)
     
-    # Load the prebuilt graph
-    try:
-        with open('graph_prebuilt.pkl', 'rb') as f:
-            data = pickle.load(f)
-            if len(data) == 4:
-                G, lights, businesses, bbox = data
-            else:
-                G, lights, bbox = data
-        print(f"\n✓ Loaded graph: {len(G.nodes())} nodes, {len(G.edges())} edges\n")
-    except Exception as e:
-        print(f"✗ Failed to load graph: {e}")
-        return False
-    
-    # The FIXED safest_weight function
-    def safest_weight(u, v, edge_data):
-        """Fixed safest_weight: danger is a direct cost multiplier"""
-        length = edge_data.get('length', 1)
-        danger = edge_data.get('danger_score', 50)
-        sidewalk_score = edge_data.get('sidewalk_score', 0)
-        is_footpath = (sidewalk_score >= 0.99)
-        road_penalty = 1.0 if is_footpath else 10.0
-        
-        return (length * road_penalty * (danger + 1)) / 100.0
+    # Prebuilt graph, loaded once per session (see conftest.py)
+    G, lights, businesses, bbox = graph_data
+    print(f"\n✓ Loaded graph: {len(G.nodes())} nodes, {len(G.edges())} edges\n")
     
     print("FORMULA: weight = (length * road_penalty * danger) / 100")
     print("         Danger is a direct cost multiplier")
@@ -73,46 +54,7 @@ def main():
     print("REAL GRAPH TEST: Adjacent edges with 30+ danger point difference")
     print("-" * 70 + "\n")
     
-    found_pairs = []
-    for u, v, k, data in G.edges(keys=True, data=True):
-        danger_uv = data.get('danger_score', 50)
-        
-        for v_next, w, k_next, data_next in G.out_edges(v, keys=True, data=True):
-            danger_vw = data_next.get('danger_score', 50)
-            
-            danger_diff = abs(danger_uv - danger_vw)
-            if danger_diff >= 30:
-                found_pairs.append((u, v, k, data, v_next, w, k_next, data_next, danger_diff))
-    
-    correct = 0
-    total = min(20, len(found_pairs))
-    
-    for i, pair_data in enumerate(found_pairs[:total]):
-        u, v, k, data1, v_next, w, k_next, data2, danger_diff = pair_data
-        
-        danger_uv = data1.get('danger_score', 50)
-        danger_vw = data2.get('danger_score', 50)
-        length_uv = data1.get('length', 100)
-        length_vw = data2.get('length', 100)
-        
-        weight1 = safest_weight(u, v, data1)
-        weight2 = safest_weight(v_next, w, data2)
-        
-        safer_is_edge2 = danger_vw < danger_uv
-        chooses_edge2 = weight2 < weight1
-        
-        is_correct = safer_is_edge2 == chooses_edge2
-        if is_correct:
-            correct += 1
-        
-        status = "✓" if is_correct else "✗"
-        safer_name = "Edge 2" if safer_is_edge2 else "Edge 1"
-        chosen_name = "Edge 2" if chooses_edge2 else "Edge 1"
-        
-        print(f"{status} Pair {i+1}: danger diff={danger_diff:.1f}")
-        print(f"   E1: danger={danger_uv:5.1f}, length={length_uv:5.0f}m, weight={weight1:6.2f}")
-        print(f"   E2: danger={danger_vw:5.1f}, length={length_vw:5.0f}m, weight={weight2:6.2f}")
-        print(f"   Safer={safer_name}, Chosen={chosen_name}")
+    correct, total = run_formula_test('direct_danger', limit=20)
     
     print("\n" + "=" * 70)
     print(f"RESULT: {correct}/{total} pairs correct ({100*correct/total:.0f}%)")
@@ -125,4 +67,4 @@ def main():
     print("  • Extreme detours still avoided (reasonable trade-off)")
 
 if __name__ == '__main__':
-    main()
+    test_safe_routing_final(load_graph())
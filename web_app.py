@@ -5,16 +5,31 @@ A Flask-based web server for visualizing and comparing fastest vs safest driving
 Uses the existing graph_builder and route_visualizer logic adapted for web delivery.
 """
 
-from flask import Flask, render_template, jsonify, request, g
+from flask import Flask, Response, render_template, jsonify, request, g
+import atexit
+import collections
+import contextlib
+import copy
+import functools
+import gc
+import gzip
+import hashlib
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
 import time
 from flask_cors import CORS
 import json
 import os
 import psutil
 import numpy as np
+from dataclasses import dataclass
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from compact_graph import build_compact_graph
+from compact_graph import build_compact_graph, load_compact_graph
 
 try:
     from geopy.geocoders import Nominatim
@@ -24,126 +39,237 @@ except Exception:
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     HAS_REQUESTS = True
 except Exception:
     HAS_REQUESTS = False
 
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except Exception:
+    HAS_SCIPY = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except Exception:
+    HAS_ORJSON = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except Exception:
+    HAS_ZSTD = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except Exception:
+    HAS_BROTLI = False
+
 # BBOX for default area
 # BBOX for default area (centralized in config)
 from config import BBOX
-
-# Establish a baseline memory reading before we start heavy imports.
-_mem_at_start = psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
-print(f"[startup] Memory at module import start: {_mem_at_start:.1f} MB")
-
-_mem_after_config = psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
-print(f"[startup] Memory after config import: {_mem_after_config:.1f} MB (D +{_mem_after_config - _mem_at_start:.1f} MB)")
+_BBOX_NORTH, _BBOX_SOUTH, _BBOX_EAST, _BBOX_WEST = BBOX
+
+# Request-path diagnostics go through this logger (LOG_LEVEL=DEBUG adds per-request
+# progress lines); records are written by a listener thread so handlers never block on stdout.
+log = logging.getLogger('litroutes')
+log.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+if not log.handlers:
+    _log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+    log.addHandler(logging.handlers.QueueHandler(_log_queue))
+    log.propagate = False
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+# Memory logging: LOG_MEM_EVERY=N logs RSS at startup and around every Nth request;
+# 0 (default) logs requests only when running with app.debug.
+LOG_MEM_EVERY = int(os.environ.get('LOG_MEM_EVERY', '0'))
+_process = psutil.Process(os.getpid())
+_request_counter = itertools.count()
+
+
+def _get_process():
+    """psutil handle for this process, recreated after a fork (e.g. gunicorn workers)."""
+    global _process
+    if _process.pid != os.getpid():
+        _process = psutil.Process(os.getpid())
+    return _process
+
+
+if LOG_MEM_EVERY:
+    # Establish a baseline memory reading before we start heavy imports.
+    _mem_at_start = _get_process().memory_info().rss / 1024 / 1024
+    print(f"[startup] Memory at module import start: {_mem_at_start:.1f} MB")
 
 app = Flask(__name__, static_folder='web/static', template_folder='web/templates')
 CORS(app)
 
-_mem_after_flask = psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
-print(f"[startup] Memory after Flask/CORS: {_mem_after_flask:.1f} MB (D +{_mem_after_flask - _mem_after_config:.1f} MB)")
+if LOG_MEM_EVERY:
+    _mem_after_flask = _get_process().memory_info().rss / 1024 / 1024
+    print(f"[startup] Memory after Flask/CORS: {_mem_after_flask:.1f} MB (D +{_mem_after_flask - _mem_at_start:.1f} MB)")
 
 # --- Helper functions ---
 
-def is_business_open_at_time(opening_hours, check_time):
-    """Check if a business is open at a given time.
-    
-    Args:
-        opening_hours: List of period dicts from Google Places API
-            Each period has: {"open": {"day": 0-6, "hour": 0-23, "minute": 0-59}, 
-                             "close": {"day": 0-6, "hour": 0-23, "minute": 0-59}}
-        check_time: datetime object or ISO format string
-    
-    Returns:
-        bool: True if open at check_time, False otherwise (or if hours unknown)
+def _local_day_minutes(check_time):
+    """(day, minute_of_day) of check_time in Eastern time, Google day numbering (0=Sunday).
+
+    check_time is a datetime or ISO format string; returns None if it can't be
+    interpreted, in which case callers treat businesses as open.
     """
-    try:
-        if not opening_hours:
-            # No hours data available - assume open for backward compatibility
-            return True
-        
-        # Ensure opening_hours is a list
-        if not isinstance(opening_hours, list):
-            return True
-        
-        # Parse check_time if it's a string
-        if isinstance(check_time, str):
-            try:
-                check_time = datetime.fromisoformat(check_time.replace('Z', '+00:00'))
-            except Exception as e:
-                print(f"Warning: Could not parse time '{check_time}': {e}")
-                return True
-        
-        # If check_time is not a datetime object at this point, assume open
-        if not isinstance(check_time, datetime):
-            return True
-        
-        # Convert UTC time to Eastern time (where the businesses are located)
-        # Google Places opening hours are in the business's local timezone
+    # Parse check_time if it's a string
+    if isinstance(check_time, str):
         try:
-            eastern_tz = ZoneInfo("America/New_York")
-            if check_time.tzinfo is None:
-                # If naive datetime, assume it's already in local time
-                check_time_local = check_time
-            else:
-                # Convert from UTC to Eastern
-                check_time_local = check_time.astimezone(eastern_tz)
+            check_time = datetime.fromisoformat(check_time.replace('Z', '+00:00'))
         except Exception as e:
-            print(f"Warning: Timezone conversion failed: {e}")
+            log.warning("Could not parse time '%s': %s", check_time, e)
+            return None
+
+    # If check_time is not a datetime object at this point, assume open
+    if not isinstance(check_time, datetime):
+        return None
+
+    # Convert UTC time to Eastern time (where the businesses are located)
+    # Google Places opening hours are in the business's local timezone
+    try:
+        eastern_tz = ZoneInfo("America/New_York")
+        if check_time.tzinfo is None:
+            # If naive datetime, assume it's already in local time
             check_time_local = check_time
-        
-        # Get day of week (0=Monday in Python, but Google uses 0=Sunday)
-        check_day = (check_time_local.weekday() + 1) % 7  # Convert Python's Monday=0 to Google's Sunday=0
-        check_minutes = check_time_local.hour * 60 + check_time_local.minute
-        
-        # Check each period to see if we're in an open window
+        else:
+            # Convert from UTC to Eastern
+            check_time_local = check_time.astimezone(eastern_tz)
+    except Exception as e:
+        log.warning("Timezone conversion failed: %s", e)
+        check_time_local = check_time
+
+    # Get day of week (0=Monday in Python, but Google uses 0=Sunday)
+    check_day = (check_time_local.weekday() + 1) % 7  # Convert Python's Monday=0 to Google's Sunday=0
+    check_minutes = check_time_local.hour * 60 + check_time_local.minute
+    return check_day, check_minutes
+
+
+def freeze_opening_hours(opening_hours):
+    """Reduce Google Places periods to a hashable tuple of (open_day, open_min, close_day, close_min).
+
+    Returns None when the hours are missing or malformed, meaning "assume open".
+    """
+    if not opening_hours:
+        # No hours data available - assume open for backward compatibility
+        return None
+
+    # Ensure opening_hours is a list
+    if not isinstance(opening_hours, list):
+        return None
+
+    try:
+        frozen = []
         for period in opening_hours:
             if not isinstance(period, dict):
                 continue
-                
+
             open_info = period.get("open", {})
             close_info = period.get("close", {})
-            
+
             if not open_info or not close_info:
                 continue
-                
-            open_day = open_info.get("day", -1)
-            open_minutes = open_info.get("hour", 0) * 60 + open_info.get("minute", 0)
-            close_day = close_info.get("day", -1)
-            close_minutes = close_info.get("hour", 0) * 60 + close_info.get("minute", 0)
-            
-            # Handle same-day hours
-            if open_day == close_day == check_day:
-                if open_minutes <= check_minutes < close_minutes:
-                    return True
-            
-            # Handle hours that span midnight
-            elif open_day != close_day:
-                # Check if we're on the opening day after opening time
-                if check_day == open_day and check_minutes >= open_minutes:
-                    return True
-                # Check if we're on the closing day before closing time
-                elif check_day == close_day and check_minutes < close_minutes:
-                    return True
-        
-        return False
+
+            frozen.append((
+                open_info.get("day", -1),
+                open_info.get("hour", 0) * 60 + open_info.get("minute", 0),
+                close_info.get("day", -1),
+                close_info.get("hour", 0) * 60 + close_info.get("minute", 0),
+            ))
+        return tuple(frozen)
     except Exception as e:
-        print(f"Error in is_business_open_at_time: {e}")
-        import traceback
-        traceback.print_exc()
+        log.error("Error in freeze_opening_hours: %s", e)
         # On any error, assume open to avoid breaking the app
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_open_frozen(frozen_hours, check_day, check_minutes):
+    """Open check for freeze_opening_hours() output at a (day, minute) in local time."""
+    if frozen_hours is None:
+        return True
+
+    # Check each period to see if we're in an open window
+    for open_day, open_minutes, close_day, close_minutes in frozen_hours:
+        # Handle same-day hours
+        if open_day == close_day == check_day:
+            if open_minutes <= check_minutes < close_minutes:
+                return True
+
+        # Handle hours that span midnight
+        elif open_day != close_day:
+            # Check if we're on the opening day after opening time
+            if check_day == open_day and check_minutes >= open_minutes:
+                return True
+            # Check if we're on the closing day before closing time
+            elif check_day == close_day and check_minutes < close_minutes:
+                return True
+
+    return False
+
+
+def is_business_open_at_time(opening_hours, check_time):
+    """Check if a business is open at a given time.
+    
+    Args:
+        opening_hours: List of period dicts from Google Places API
+            Each period has: {"open": {"day": 0-6, "hour": 0-23, "minute": 0-59}, 
+                             "close": {"day": 0-6, "hour": 0-23, "minute": 0-59}}
+        check_time: datetime object or ISO format string
+    
+    Returns:
+        bool: True if open at check_time, False otherwise (or if hours unknown)
+    """
+    frozen = freeze_opening_hours(opening_hours)
+    if frozen is None:
         return True
+    day_minutes = _local_day_minutes(check_time)
+    if day_minutes is None:
+        return True
+    return _is_open_frozen(frozen, *day_minutes)
 
 # --- Business Score Recalculation ---
 
+# Keep-alive connection pool for OSRM so repeat requests skip the TCP/TLS handshake
+if HAS_REQUESTS:
+    _OSRM_SESSION = requests.Session()
+    _OSRM_SESSION.mount('https://', HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    ))
+else:
+    _OSRM_SESSION = None
+
+
+@functools.lru_cache(maxsize=1)
+def _get_geolocator():
+    """Shared Nominatim client; its requests adapter keeps connections alive between calls."""
+    return Nominatim(user_agent="litwalks_web")
+
+
 def geocode_address(address):
-    """Convert an address string to (lat, lon) coordinates using Nominatim."""
+    """Convert an address string to (lat, lon) coordinates using Nominatim.
+
+    Results are cached per normalized address (case and whitespace folded).
+    """
     if not HAS_GEOPY:
         raise ImportError("geopy is required for address geocoding. Install with: pip install geopy")
+    return _geocode_normalized(' '.join(address.split()).lower())
+
 
-    geolocator = Nominatim(user_agent="litwalks_web")
+@functools.lru_cache(maxsize=8192)
+def _geocode_normalized(address):
+    """Uncached Nominatim lookup behind geocode_address(); failures raise and are not cached."""
+    geolocator = _get_geolocator()
     address_variants = [
         address,
         address.split(',')[0] + ',' + ','.join(address.split(',')[1:]),
@@ -158,11 +284,12 @@ def geocode_address(address):
         if len(parts) >= 2:
             address_variants.append(', '.join(parts[-2:]))
 
-    for variant in address_variants:
+    # Variants often coincide; query each distinct one once
+    for variant in dict.fromkeys(address_variants):
         try:
             location = geolocator.geocode(variant, timeout=10)
             if location:
-                print(f"  ✓ '{address}' -> ({location.latitude}, {location.longitude})")
+                log.info("  ✓ '%s' -> (%s, %s)", address, location.latitude, location.longitude)
                 return location.latitude, location.longitude
         except Exception:
             continue
@@ -174,280 +301,481 @@ def geocode_address(address):
 
 
 def get_osrm_route(lat1, lon1, lat2, lon2):
-    """Get route from OSRM API (public server)."""
+    """Get route from OSRM API (public server).
+
+    Routes are cached by endpoints rounded to 5 decimals (~1 m); failed
+    lookups return None and are retried on the next call.
+    """
     if not HAS_REQUESTS:
         return None
     try:
-        url = f"https://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?geometries=geojson"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('code') == 'Ok' and data.get('routes'):
-            coords = data['routes'][0]['geometry']['coordinates']
-            route = [(lat, lon) for lon, lat in coords]
-            distance = data['routes'][0]['distance']
-            duration = data['routes'][0]['duration']
-            return route, distance, duration
-        print(f"  ⚠️ OSRM error: {data.get('message', 'Unknown error')}")
+        route, distance, duration = _get_osrm_route_cached(
+            round(float(lat1), 5), round(float(lon1), 5), round(float(lat2), 5), round(float(lon2), 5)
+        )
+        return list(route), distance, duration
+    except LookupError:
         return None
     except Exception as e:
-        print(f"  ⚠️ OSRM API error: {e}")
+        log.warning("  ⚠️ OSRM API error: %s", e)
         return None
 
 
+@functools.lru_cache(maxsize=4096)
+def _get_osrm_route_cached(lat1, lon1, lat2, lon2):
+    """OSRM request behind get_osrm_route(); raises on any failure so it isn't cached."""
+    url = f"https://router.project-osrm.org/route/v1/driving/{lon1},{lat1};{lon2},{lat2}?geometries=geojson"
+    response = _OSRM_SESSION.get(url, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    if data.get('code') == 'Ok' and data.get('routes'):
+        coords = data['routes'][0]['geometry']['coordinates']
+        route = tuple((lat, lon) for lon, lat in coords)
+        distance = data['routes'][0]['distance']
+        duration = data['routes'][0]['duration']
+        return route, distance, duration
+    log.warning("  ⚠️ OSRM error: %s", data.get('message', 'Unknown error'))
+    raise LookupError(data.get('message', 'Unknown error'))
+
+
+def _attach_node_tree(compact):
+    """Build the KD-tree over node (x, y) that snap_to_nearest_node() queries."""
+    compact.node_tree = None
+    if HAS_SCIPY and len(compact.node_ids):
+        compact.node_tree = cKDTree(np.column_stack([compact.node_x, compact.node_y]))
+    return compact
+
+
+def _build_light_index(lights):
+    """Lights as an (n, 2) float64 (lat, lon) array plus a KD-tree over it when SciPy is available."""
+    coords = np.array(lights, dtype=np.float64).reshape(-1, 2)
+    tree = cKDTree(coords) if HAS_SCIPY and len(coords) else None
+    return coords, tree
+
+
+def _get_light_index(lights):
+    """((n, 2) float64 (lat, lon) array, cKDTree or None) for lights, reusing the graph-load copy."""
+    bbox_key = str(BBOX)
+    if lights is _lights_cache.get(bbox_key) and bbox_key in _light_index_cache:
+        return _light_index_cache[bbox_key]
+    return _build_light_index(lights)
+
+
+def is_within_bounds(lat, lon):
+    """True if (lat, lon) lies inside the service area BBOX."""
+    return _BBOX_SOUTH <= lat <= _BBOX_NORTH and _BBOX_WEST <= lon <= _BBOX_EAST
+
+
 def snap_to_nearest_node(compact_graph, lat, lon):
     """Find nearest node in compact graph to (lat, lon)."""
-    dx = compact_graph.node_x - float(lon)
-    dy = compact_graph.node_y - float(lat)
-    idx = int(np.argmin(dx * dx + dy * dy))
-    return compact_graph.node_ids[idx]
+    return snap_to_nearest_nodes(compact_graph, [(lat, lon)])[0]
 
-def _recalculate_business_scores(G, businesses, departure_time):
-    """Recalculate business proximity scores based on open businesses at departure_time.
-    
-    This creates a modified copy of the graph with updated business_score and 
-    recalculated danger_score/optimized_weight based on which businesses are open.
-    
-    Args:
-        G: NetworkX graph with pre-calculated scores
-        businesses: List of business tuples (lat, lon, name, type, hours, review_count, is_open)
-        departure_time: ISO format datetime string
-    
-    Returns:
-        Modified graph with updated scores
+
+def snap_to_nearest_nodes(compact_graph, points):
+    """Nearest compact graph node ID for each (lat, lon) in points, in one KD-tree query."""
+    lonlat = np.array([(float(lon), float(lat)) for lat, lon in points], dtype=np.float64).reshape(-1, 2)
+    tree = getattr(compact_graph, 'node_tree', None)
+    if tree is not None:
+        _, idx = tree.query(lonlat, k=1)
+    else:
+        idx = []
+        for lon, lat in lonlat:
+            dx = compact_graph.node_x - lon
+            dy = compact_graph.node_y - lat
+            idx.append(np.argmin(dx * dx + dy * dy))
+    return [compact_graph.node_ids[int(i)] for i in idx]
+
+
+# Danger score weights (same as graph_builder)
+W_DARKNESS = 40.0
+W_SIDEWALK = 30.0
+W_BUSINESS = 15.0
+W_LAND = 10.0
+W_SPEED = 5.0
+FOOTPATH_PENALTY = 1.0
+ROAD_PENALTY = 10.0
+
+# Business proximity: edges within 100m of an open business score as "near"
+PROXIMITY_THRESHOLD_KM = 0.1
+BUSINESS_SCORE_NEAR = 0.9
+BUSINESS_SCORE_FAR = 0.3
+
+EARTH_RADIUS_KM = 6371.0
+# KD-tree candidate radius padding for the equirectangular projection error
+PROJECTION_RADIUS_PAD = 1.01
+# Max edge x business pairs per block in the no-SciPy haversine fallback
+HAVERSINE_BLOCK_PAIRS = 4_000_000
+# Proximity counts kept per distinct set of open businesses (per compact graph)
+NEARBY_COUNT_CACHE_SIZE = 32
+# A route segment counts as lit with a streetlight within ~0.001 degrees (~111 m) of its midpoint
+LIGHT_RADIUS_DEG = 0.001
+
+# Opening hours are bit-packed per business over minute-of-week (Google day numbering)
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+_WEEK_DAYS = range(7)
+
+
+def _recompute_edge_weights(darkness, sidewalk, land_risk, speed_risk, travel_time, length, is_footpath, business_score):
+    """Danger score and fastest/safest routing weights for every edge.
+
+    All inputs are per-edge arrays; the sums are accumulated in place so the
+    whole recompute allocates only the three output arrays and one scratch.
+    Returns (danger, optimized_weight, safest_weight).
     """
-    import copy
-    from math import radians, cos, sin, asin, sqrt
-    
-    # Constants from graph_builder (should match)
-    W_DARKNESS = 40.0
-    W_SIDEWALK = 30.0
-    W_BUSINESS = 15.0
-    W_LAND = 10.0
-    W_SPEED = 5.0
-    DANGER_MULTIPLIER = 3.0
-    PROXIMITY_THRESHOLD_KM = 0.1  # 100m - businesses within this radius affect safety
-    
-    def haversine_km(lat1, lon1, lat2, lon2):
-        """Calculate distance between two points in km."""
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        return c * 6371  # Earth radius in km
-    
-    # Filter to only open businesses
-    open_businesses = []
-    for biz in businesses:
-        if len(biz) >= 7:
-            lat, lon, name, btype, hours, review_count, is_open = biz[:7]
-            if is_business_open_at_time(hours, departure_time):
-                open_businesses.append((lat, lon, name))
-    
-    print(f"  Open businesses at {departure_time}: {len(open_businesses)}/{len(businesses)}")
-    
-    # Recalculate business scores for all edges
-    edges_updated = 0
-    score_changes = []  # Track some score changes for debugging
-    for u, v, k, data in G.edges(keys=True, data=True):
-        # Store original danger score for comparison
-        original_danger = data.get('danger_score', 0)
-        
-        # Get edge midpoint
-        if 'geometry' in data and hasattr(data['geometry'], 'coords'):
-            coords = list(data['geometry'].coords)
-            mid_idx = len(coords) // 2
-            edge_lat, edge_lon = coords[mid_idx][1], coords[mid_idx][0]  # (x, y) = (lon, lat)
-        else:
-            # Fallback: use node coordinates
-            node_u_data = G.nodes[u]
-            node_v_data = G.nodes[v]
-            edge_lat = (node_u_data.get('y', 0) + node_v_data.get('y', 0)) / 2
-            edge_lon = (node_u_data.get('x', 0) + node_v_data.get('x', 0)) / 2
-        
-        # Count open businesses within proximity threshold
-        nearby_count = 0
-        for biz_lat, biz_lon, biz_name in open_businesses:
-            dist = haversine_km(edge_lat, edge_lon, biz_lat, biz_lon)
-            if dist <= PROXIMITY_THRESHOLD_KM:
-                nearby_count += 1
-        
-        # Calculate new business score (same logic as graph_builder)
-        if nearby_count > 0:
-            business_score = 0.9  # Good: near open businesses
-        else:
-            business_score = 0.3  # Poor: isolated area
-        
-        # Get other pre-calculated components
-        darkness_score = data.get('darkness_score', 0.5)
-        sidewalk_score = data.get('sidewalk_score', 0.5)
-        land_risk = data.get('land_risk', 0.5)
-        speed_risk = data.get('speed_risk', 0.5)
-        travel_time = data.get('travel_time', 1)
-        
-        # Recalculate danger score with new business component
-        danger = (
-            W_DARKNESS * darkness_score +
-            W_SIDEWALK * (1.0 - sidewalk_score) +
-            W_BUSINESS * (1.0 - business_score) +  # Updated component
-            W_LAND * land_risk +
-            W_SPEED * speed_risk
+    danger = np.multiply(W_DARKNESS, darkness)
+    tmp = np.subtract(1.0, sidewalk)
+    danger += np.multiply(W_SIDEWALK, tmp, out=tmp)
+    tmp = np.subtract(1.0, business_score, out=tmp)
+    danger += np.multiply(W_BUSINESS, tmp, out=tmp)
+    danger += np.multiply(W_LAND, land_risk, out=tmp)
+    danger += np.multiply(W_SPEED, speed_risk, out=tmp)
+
+    road_penalty = np.where(is_footpath, FOOTPATH_PENALTY, ROAD_PENALTY)
+    # optimized_weight = travel_time * penalty / (100 - danger + 0.01)
+    optimized_weight = np.multiply(travel_time, road_penalty)
+    optimized_weight /= np.add(100.0 - danger, 0.01, out=tmp)
+    # safest_weight = danger * length * penalty
+    safest_weight = np.multiply(danger, length)
+    safest_weight *= road_penalty
+    return danger, optimized_weight, safest_weight
+
+
+def _haversine_km(lat1, lon1, lat2, lon2, cos_lat1=None):
+    """Great-circle distance in km between points given in radians (broadcasts).
+
+    cos_lat1 may be passed when cos(lat1) is already known.
+    """
+    if cos_lat1 is None:
+        cos_lat1 = np.cos(lat1)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+
+def _project_km(lat, lon, cos_lat0):
+    """Local equirectangular (x, y) in km for points given in radians."""
+    return np.column_stack([lon * cos_lat0, lat]) * EARTH_RADIUS_KM
+
+
+def _attach_edge_midpoints(compact):
+    """Precompute edge midpoints (radians), their cosines and a KD-tree over them.
+
+    Stored on the compact graph at load so business recomputes only have to
+    project the businesses.
+    """
+    eu = compact.edge_u_idx
+    ev = compact.edge_v_idx
+    compact.edge_mid_lat_rad = np.radians((compact.node_y[eu].astype(np.float64) + compact.node_y[ev]) / 2.0)
+    compact.edge_mid_lon_rad = np.radians((compact.node_x[eu].astype(np.float64) + compact.node_x[ev]) / 2.0)
+    compact.edge_mid_cos_lat = np.cos(compact.edge_mid_lat_rad)
+    compact.edge_mid_cos_lat0 = float(np.cos(np.mean(compact.edge_mid_lat_rad))) if len(eu) else 1.0
+    compact.edge_mid_tree = None
+    if HAS_SCIPY and len(eu):
+        compact.edge_mid_tree = cKDTree(_project_km(compact.edge_mid_lat_rad, compact.edge_mid_lon_rad, compact.edge_mid_cos_lat0))
+    return compact
+
+
+def _count_businesses_near_edges(compact, blat, blon, radius_km):
+    """Number of businesses (lat/lon in radians) within radius_km of each edge midpoint.
+
+    With SciPy, the edge midpoint KD-tree finds candidate pairs (radius padded
+    by 1% for the projection error) which are then checked with the haversine
+    distance; without it, all pairs are compared in blocks.
+    """
+    lat = compact.edge_mid_lat_rad
+    lon = compact.edge_mid_lon_rad
+    cos_lat = compact.edge_mid_cos_lat
+    counts = np.zeros(len(lat), dtype=np.int64)
+    if compact.edge_mid_tree is not None:
+        biz_tree = cKDTree(_project_km(blat, blon, compact.edge_mid_cos_lat0))
+        candidates = biz_tree.query_ball_tree(compact.edge_mid_tree, r=radius_km * PROJECTION_RADIUS_PAD)
+        biz_idx = np.repeat(np.arange(len(candidates)), [len(c) for c in candidates])
+        idx = np.fromiter((i for c in candidates for i in c), dtype=np.int64, count=len(biz_idx))
+        within = _haversine_km(lat[idx], lon[idx], blat[biz_idx], blon[biz_idx], cos_lat[idx]) <= radius_km
+        np.add.at(counts, idx[within], 1)
+        return counts
+    # Haversine over an (edges x businesses) block at a time to bound memory
+    block = max(1, HAVERSINE_BLOCK_PAIRS // len(blat))
+    for start in range(0, len(lat), block):
+        sl = slice(start, start + block)
+        dist = _haversine_km(lat[sl, None], lon[sl, None], blat[None, :], blon[None, :], cos_lat[sl, None])
+        counts[sl] = (dist <= radius_km).sum(axis=1)
+    return counts
+
+
+def _static_recompute_inputs(compact):
+    """float64 copies of the per-edge inputs the business recompute never changes.
+
+    Built on first use and kept on the compact graph, so repeated recomputes
+    skip the casts and default fills. Returns (darkness, sidewalk, land_risk,
+    speed_risk, travel_time, length, is_footpath).
+    """
+    inputs = getattr(compact, 'recompute_inputs', None)
+    if inputs is None:
+        edge_count = len(compact.edge_u_idx)
+
+        def _field(arr, default):
+            return arr.astype(np.float64) if arr.size else np.full(edge_count, default)
+
+        inputs = (
+            _field(compact.edge_darkness_score, 0.5),
+            _field(compact.edge_sidewalk, 0.5),
+            _field(compact.edge_land_risk, 0.5),
+            _field(compact.edge_speed_risk, 0.5),
+            _field(compact.edge_travel_time, 1.0),
+            _field(compact.edge_length, 1.0),
+            compact.edge_is_footpath if compact.edge_is_footpath.size else np.zeros(edge_count, dtype=bool),
         )
-        
-        # Recalculate optimized weight (for routing) - match graph_builder.py formula
-        # Apply 10x penalty for roads vs footpaths, divide by safety (higher safety = lower weight)
-        is_footpath = (sidewalk_score >= 0.99)
-        road_penalty = 1.0 if is_footpath else 10.0
-        safety_for_routing = 100.0 - danger
-        optimized_weight = travel_time * road_penalty / (safety_for_routing + 0.01)
-        
-        # Update edge data
-        data['business_score'] = business_score
-        data['business_count'] = nearby_count
-        data['danger_score'] = danger
-        data['optimized_weight'] = optimized_weight
-        
-        # Also update safety_score (inverse of danger, used for visualization)
-        data['safety_score'] = 100 - danger
-        
-        # Track significant changes for debugging
-        if len(score_changes) < 5 and abs(danger - original_danger) > 1.0:
-            score_changes.append({
-                'edge': f"{u}->{v}",
-                'old_danger': original_danger,
-                'new_danger': danger,
-                'old_biz': data.get('business_score', 0.5),
-                'new_biz': business_score,
-                'nearby': nearby_count
-            })
-        
-        edges_updated += 1
-    
-    print(f"  Updated business scores for {edges_updated} edges")
-    if score_changes:
-        print(f"  Sample score changes:")
-        for change in score_changes:
-            print(f"    {change['edge']}: danger {change['old_danger']:.1f}->{change['new_danger']:.1f}, biz {change['old_biz']:.2f}->{change['new_biz']:.2f}, nearby={change['nearby']}")
-    
-    return G
+        compact.recompute_inputs = inputs
+    return inputs
 
 
 def _recalculate_business_scores_compact(compact, businesses, departure_time):
-    """Recalculate business proximity scores on compact graph in-place."""
-    from math import radians, cos, sin, asin, sqrt
-
-    W_DARKNESS = 40.0
-    W_SIDEWALK = 30.0
-    W_BUSINESS = 15.0
-    W_LAND = 10.0
-    W_SPEED = 5.0
-    PROXIMITY_THRESHOLD_KM = 0.1
-
-    def haversine_km(lat1, lon1, lat2, lon2):
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        return c * 6371
-
-    open_businesses = []
-    for biz in businesses:
-        if len(biz) >= 7:
-            lat, lon, name, btype, hours, review_count, is_open = biz[:7]
-            if is_business_open_at_time(hours, departure_time):
-                open_businesses.append((lat, lon, name))
-
-    print(f"  Open businesses at {departure_time}: {len(open_businesses)}/{len(businesses)}")
+    """Recalculate business proximity scores on compact graph.
+
+    Proximity counts and the danger/weight formulas are evaluated over whole
+    edge arrays rather than one edge at a time. The score fields are rebound to
+    new arrays instead of written in place, so a snapshot taken before the call
+    (see _maybe_recalculate_business_scores_compact) keeps its own arrays.
+    """
+    # Parse departure_time once; the week of opening hours is bit-packed at graph load
+    day_minutes = _local_day_minutes(departure_time)
+    arrays = _get_business_arrays(businesses)
+    is_open = arrays.scored.copy()
+    if day_minutes is not None:
+        is_open &= _open_at_minute(arrays.open_week, *day_minutes)
+    open_idx = np.flatnonzero(is_open)
+
+    log.debug("  Open businesses at %s: %d/%d", departure_time, len(open_idx), len(businesses))
 
     edge_count = len(compact.edge_u_idx)
-    for i in range(edge_count):
-        u_idx = int(compact.edge_u_idx[i])
-        v_idx = int(compact.edge_v_idx[i])
-
-        edge_lat = (float(compact.node_y[u_idx]) + float(compact.node_y[v_idx])) / 2.0
-        edge_lon = (float(compact.node_x[u_idx]) + float(compact.node_x[v_idx])) / 2.0
-
-        nearby_count = 0
-        for biz_lat, biz_lon, _ in open_businesses:
-            dist = haversine_km(edge_lat, edge_lon, biz_lat, biz_lon)
-            if dist <= PROXIMITY_THRESHOLD_KM:
-                nearby_count += 1
-
-        business_score = 0.9 if nearby_count > 0 else 0.3
-
-        darkness_score = float(compact.edge_darkness_score[i]) if compact.edge_darkness_score.size else 0.5
-        sidewalk_score = float(compact.edge_sidewalk[i]) if compact.edge_sidewalk.size else 0.5
-        land_risk = float(compact.edge_land_risk[i]) if compact.edge_land_risk.size else 0.5
-        speed_risk = float(compact.edge_speed_risk[i]) if compact.edge_speed_risk.size else 0.5
-        travel_time = float(compact.edge_travel_time[i]) if compact.edge_travel_time.size else 1.0
-        length = float(compact.edge_length[i]) if compact.edge_length.size else 1.0
-
-        danger = (
-            W_DARKNESS * darkness_score +
-            W_SIDEWALK * (1.0 - sidewalk_score) +
-            W_BUSINESS * (1.0 - business_score) +
-            W_LAND * land_risk +
-            W_SPEED * speed_risk
-        )
+    if edge_count == 0:
+        return compact
+
+    if not hasattr(compact, 'edge_mid_lat_rad'):
+        _attach_edge_midpoints(compact)
+
+    # Departure times with the same set of open businesses share their proximity counts
+    count_cache = None
+    if businesses is _businesses_cache:
+        count_cache = compact.__dict__.setdefault('nearby_count_cache', collections.OrderedDict())
+    cache_key = open_idx.tobytes()
+    if count_cache is not None and cache_key in count_cache:
+        count_cache.move_to_end(cache_key)
+        nearby_count = count_cache[cache_key]
+    else:
+        nearby_count = np.zeros(edge_count, dtype=np.int64)
+        if len(open_idx):
+            nearby_count = _count_businesses_near_edges(
+                compact, arrays.lat_rad[open_idx], arrays.lon_rad[open_idx], PROXIMITY_THRESHOLD_KM
+            )
+        if count_cache is not None:
+            count_cache[cache_key] = nearby_count
+            if len(count_cache) > NEARBY_COUNT_CACHE_SIZE:
+                count_cache.popitem(last=False)
+
+    business_score = np.where(nearby_count > 0, BUSINESS_SCORE_NEAR, BUSINESS_SCORE_FAR)
+
+    danger, optimized_weight, safest_weight = _recompute_edge_weights(
+        *_static_recompute_inputs(compact), business_score
+    )
 
-        is_footpath = bool(compact.edge_is_footpath[i]) if compact.edge_is_footpath.size else False
-        road_penalty = 1.0 if is_footpath else 10.0
-        safety_for_routing = 100.0 - danger
-        optimized_weight = travel_time * road_penalty / (safety_for_routing + 0.01)
-        safest_weight = danger * length * road_penalty
-
-        if compact.edge_business_score.size:
-            compact.edge_business_score[i] = business_score
-        if compact.edge_business_count.size:
-            compact.edge_business_count[i] = nearby_count
-        if compact.edge_danger.size:
-            compact.edge_danger[i] = danger
-        if compact.edge_optimized_weight.size:
-            compact.edge_optimized_weight[i] = optimized_weight
-        if compact.weights_fastest.size:
-            compact.weights_fastest[i] = optimized_weight
-        if compact.weights_safest.size:
-            compact.weights_safest[i] = safest_weight
+    for name, values in (
+        ('edge_business_score', business_score),
+        ('edge_business_count', nearby_count),
+        ('edge_danger', danger),
+        ('edge_optimized_weight', optimized_weight),
+        ('weights_fastest', optimized_weight),
+        ('weights_safest', safest_weight),
+    ):
+        current = getattr(compact, name)
+        if current.size:
+            setattr(compact, name, np.array(values, dtype=current.dtype))
 
     return compact
 
 
 def _maybe_recalculate_business_scores_compact(compact, businesses, departure_time):
-    """Recalculate business scores only when the departure_time changes."""
+    """Recalculate business scores only when the departure_time changes.
+
+    Returns a shallow copy of compact taken under the same lock as the
+    recompute. Its score arrays all belong to one departure_time even if a
+    concurrent request rebinds the shared ones later, so routing and feature
+    building should read only the returned copy.
+    """
     global _last_business_scores_key
-    if not departure_time or not businesses:
-        return
     key = (str(BBOX), departure_time)
-    if _last_business_scores_key == key:
-        return
-    _recalculate_business_scores_compact(compact, businesses, departure_time)
-    _last_business_scores_key = key
+    with _business_scores_lock:
+        if departure_time and businesses and _last_business_scores_key != key:
+            _recalculate_business_scores_compact(compact, businesses, departure_time)
+            _last_business_scores_key = key
+        return copy.copy(compact)
 
 # --- Pre-built graph loading (lazy + compressed) ---
 _GRAPH_PREBUILT_FILE = 'graph_prebuilt.pkl'
 _GRAPH_PREBUILT_FILE_GZ = 'graph_prebuilt.pkl.gz'
+_GRAPH_PREBUILT_FILE_ZST = 'graph_prebuilt.pkl.zst'
+_GRAPH_COMPACT_DIR = 'graph_prebuilt'  # .npy arrays + meta.json written by build_graph_offline.py
 _compact_graph_cache = {}
 _lights_cache = {}
+_light_index_cache = {}  # _build_light_index() of each _lights_cache entry
 _businesses_cache = None
+_business_arrays = None  # _build_business_arrays() of _businesses_cache
 _last_business_scores_key = None
+_business_scores_lock = threading.Lock()
 _GRAPH_LOADED = False
 _GRAPH_LOAD_ERROR = None
 
+def _freeze_business_hours(businesses):
+    """freeze_opening_hours() of each business record's hours (None if it has none)."""
+    return [freeze_opening_hours(biz[4]) if len(biz) > 4 else None for biz in businesses]
+
+
+def _open_week_row(frozen):
+    """Boolean open flag for every minute of the week (day * 1440 + minute) of frozen hours.
+
+    Matches _is_open_frozen(): same-day periods cover [open, close), overnight
+    periods run from open to midnight on the open day and from midnight to close
+    on the close day, and None (no usable hours) is open all week.
+    """
+    row = np.zeros(MINUTES_PER_WEEK, dtype=bool)
+    if frozen is None:
+        row[:] = True
+        return row
+    for open_day, open_min, close_day, close_min in frozen:
+        if open_day == close_day:
+            if open_day in _WEEK_DAYS and close_min > open_min:
+                base = int(open_day) * MINUTES_PER_DAY
+                row[base + max(open_min, 0):base + min(close_min, MINUTES_PER_DAY)] = True
+            continue
+        if open_day in _WEEK_DAYS and open_min < MINUTES_PER_DAY:
+            base = int(open_day) * MINUTES_PER_DAY
+            row[base + max(open_min, 0):base + MINUTES_PER_DAY] = True
+        if close_day in _WEEK_DAYS and close_min > 0:
+            base = int(close_day) * MINUTES_PER_DAY
+            row[base:base + min(close_min, MINUTES_PER_DAY)] = True
+    return row
+
+
+def _build_open_week(businesses):
+    """Bit-packed (n_businesses, MINUTES_PER_WEEK / 8) matrix of when each business is open."""
+    rows = [_open_week_row(frozen) for frozen in _freeze_business_hours(businesses)]
+    if not rows:
+        return np.zeros((0, MINUTES_PER_WEEK // 8), dtype=np.uint8)
+    return np.packbits(np.vstack(rows), axis=1)
+
+
+def _business_record(biz):
+    """/api/businesses entry for a business tuple, or None if it has fewer than 4 fields."""
+    # Handle both old (lat, lon, name, btype) and new (lat, lon, name, btype, hours, review_count, is_open) formats
+    if len(biz) < 4:
+        return None
+    lat, lon, name, btype = biz[:4]
+    hours = biz[4] if len(biz) > 4 else []
+    return {
+        'lat': lat,
+        'lon': lon,
+        'name': name,
+        'type': btype,
+        'hours': hours if isinstance(hours, list) else [],
+        'review_count': biz[5] if len(biz) > 5 else 0,
+        'is_open': biz[6] if len(biz) > 6 else True
+    }
+
+
+@dataclass
+class BusinessArrays:
+    """Struct-of-arrays view of a businesses list, one row per business."""
+    lat_rad: np.ndarray  # float64 radians; NaN for records the score recompute skips
+    lon_rad: np.ndarray
+    scored: np.ndarray  # bool: full 7-field records, the ones the score recompute uses
+    open_week: np.ndarray  # _build_open_week()
+    records: list  # _business_record() of each business
+
+
+def _build_business_arrays(businesses):
+    """BusinessArrays for a list of business tuples."""
+    scored = np.fromiter((len(biz) >= 7 for biz in businesses), dtype=bool, count=len(businesses))
+    lat = np.array([biz[0] if len(biz) >= 7 else np.nan for biz in businesses], dtype=np.float64)
+    lon = np.array([biz[1] if len(biz) >= 7 else np.nan for biz in businesses], dtype=np.float64)
+    return BusinessArrays(
+        lat_rad=np.radians(lat),
+        lon_rad=np.radians(lon),
+        scored=scored,
+        open_week=_build_open_week(businesses),
+        records=[_business_record(biz) for biz in businesses],
+    )
+
+
+def _get_business_arrays(businesses):
+    """_build_business_arrays() for businesses, reusing the copy built at graph load."""
+    if businesses is _businesses_cache and _business_arrays is not None:
+        return _business_arrays
+    return _build_business_arrays(businesses)
+
+
+def _open_at_minute(open_week, day, minutes):
+    """Boolean array: which businesses of a _build_open_week() matrix are open at (day, minutes)."""
+    minute_of_week = day * MINUTES_PER_DAY + minutes
+    column = open_week[:, minute_of_week >> 3]
+    return ((column >> (7 - (minute_of_week & 7))) & 1).astype(bool)
+
+
+def _compact_dir_is_fresh():
+    """True if the compact graph directory exists and is no older than any graph pickle."""
+    meta_path = os.path.join(_GRAPH_COMPACT_DIR, 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    meta_mtime = os.path.getmtime(meta_path)
+    sources = (_GRAPH_PREBUILT_FILE, _GRAPH_PREBUILT_FILE_GZ, _GRAPH_PREBUILT_FILE_ZST)
+    return all(meta_mtime >= os.path.getmtime(p) for p in sources if os.path.exists(p))
+
+
+def _load_compact_dir():
+    """Load the memory-mapped compact graph directory; returns False to fall back to the pickle."""
+    global _GRAPH_LOADED, _businesses_cache, _business_arrays, _last_business_scores_key
+    try:
+        print(f"[graph] Loading memory-mapped compact graph from {_GRAPH_COMPACT_DIR}/...")
+        start = time.time()
+        compact, meta = load_compact_graph(_GRAPH_COMPACT_DIR)
+        lights = [tuple(p) for p in meta.get('lights') or []]
+        _businesses_cache = meta.get('businesses') or []
+        _business_arrays = _build_business_arrays(_businesses_cache)
+        _attach_edge_midpoints(compact)
+        _attach_node_tree(compact)
+    except Exception as e:
+        print(f"[graph] WARNING: could not load {_GRAPH_COMPACT_DIR}/ ({e}); falling back to pickle")
+        return False
+    _lights_cache[str(BBOX)] = lights
+    _light_index_cache[str(BBOX)] = _build_light_index(lights)
+    _compact_graph_cache[str(BBOX)] = compact
+    _GRAPH_LOADED = True
+    _last_business_scores_key = None
+    elapsed = time.time() - start
+    print(f"[graph] Graph loaded in {elapsed:.3f}s — nodes={len(compact.node_ids)} edges={len(compact.indices)} lights={len(lights)} businesses={len(_businesses_cache)}")
+    return True
+
+
 def _load_prebuilt_graph():
-    """Load the pre-built graph from pickle file (supports gzip compression)."""
-    global _GRAPH_LOADED, _GRAPH_LOAD_ERROR, _businesses_cache, _last_business_scores_key
+    """Load the pre-built graph: the memory-mapped compact directory when fresh,
+    otherwise the pickle file (supports zstd and gzip compression)."""
+    global _GRAPH_LOADED, _GRAPH_LOAD_ERROR, _businesses_cache, _business_arrays, _last_business_scores_key
     import pickle
     import gzip
+    import io
     
-    # Try compressed file first, then uncompressed
-    if os.path.exists(_GRAPH_PREBUILT_FILE_GZ):
+    if _compact_dir_is_fresh() and _load_compact_dir():
+        return True
+
+    # Try compressed files first (zstd decompresses fastest), then uncompressed
+    if HAS_ZSTD and os.path.exists(_GRAPH_PREBUILT_FILE_ZST):
+        graph_file = _GRAPH_PREBUILT_FILE_ZST
+        compression = 'zstd'
+    elif os.path.exists(_GRAPH_PREBUILT_FILE_GZ):
         graph_file = _GRAPH_PREBUILT_FILE_GZ
-        use_gzip = True
+        compression = 'gzip'
     elif os.path.exists(_GRAPH_PREBUILT_FILE):
         graph_file = _GRAPH_PREBUILT_FILE
-        use_gzip = False
+        compression = None
     else:
         _GRAPH_LOAD_ERROR = f"Pre-built graph file not found: {_GRAPH_PREBUILT_FILE} or {_GRAPH_PREBUILT_FILE_GZ}"
         print(f"[graph] ERROR: {_GRAPH_LOAD_ERROR}")
@@ -458,7 +786,11 @@ def _load_prebuilt_graph():
         print(f"[graph] Loading pre-built graph from {graph_file}...")
         start = time.time()
         
-        if use_gzip:
+        if compression == 'zstd':
+            # Stream-decompress straight into the unpickler without a full copy in memory
+            with open(graph_file, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                data = pickle.load(io.BufferedReader(reader))
+        elif compression == 'gzip':
             with gzip.open(graph_file, 'rb') as f:
                 data = pickle.load(f)
         else:
@@ -472,12 +804,16 @@ def _load_prebuilt_graph():
         else:
             G, lights, bbox = data
             _businesses_cache = []
+        _business_arrays = _build_business_arrays(_businesses_cache)
         
         elapsed = time.time() - start
         _lights_cache[str(BBOX)] = lights
+        _light_index_cache[str(BBOX)] = _build_light_index(lights)
         try:
             compact_start = time.time()
             compact = build_compact_graph(G)
+            _attach_edge_midpoints(compact)
+            _attach_node_tree(compact)
             _compact_graph_cache[str(BBOX)] = compact
             compact_elapsed = time.time() - compact_start
             print(f"[graph] Compact routing graph built in {compact_elapsed:.3f}s — nodes={len(compact.node_ids)} edges={len(compact.indices)}")
@@ -506,7 +842,70 @@ def _load_prebuilt_graph():
 print(f"[startup] Graph will be loaded on first request (lazy loading enabled)")
 
 # --- GeoJSON response caching (deterministic output from fixed graph) ---
-_geojson_cache = {}  # Keys: 'graph-data', 'graph-data-lite'; Values: (geojson_dict, size_bytes)
+_geojson_cache = {}  # Keys: 'graph-data', 'graph-data-lite', 'graph-summary', 'sidewalks'; Values: ({content_encoding: body_bytes}, size_bytes, etag)
+GEOJSON_MAX_AGE = 3600  # seconds browsers may reuse a cached payload before revalidating
+STREAM_CHUNK_FEATURES = 2000  # features encoded per chunk of an uncached streamed response
+
+
+def _json_bytes(obj):
+    """Encode obj as compact JSON bytes, with orjson when it's installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def _json_response(payload, status=200):
+    """Flask response for already-encoded JSON bytes."""
+    return Response(payload, status=status, mimetype='application/json')
+
+
+def _iter_feature_collection_json(response, features, chunk_size=STREAM_CHUNK_FEATURES):
+    """Yield the JSON encoding of response in pieces, chunk_size edge features at a time.
+
+    response['edges']['features'] must be empty; the features are spliced in
+    where it serializes, so the joined chunks equal _json_bytes() of the full
+    response without ever holding all of it encoded at once.
+    """
+    head, tail = _json_bytes(response).split(b'"features":[]', 1)
+    yield head + b'"features":['
+    for start in range(0, len(features), chunk_size):
+        chunk = _json_bytes(features[start:start + chunk_size])[1:-1]
+        yield chunk if start == 0 else b',' + chunk
+    yield b']' + tail
+
+
+def _cache_geojson(key, payload):
+    """Store an encoded payload, its precompressed variants, size and a content hash ETag.
+
+    The payloads never change once cached, so compressing them here spares
+    every later request the work.
+    """
+    bodies = {'identity': payload, 'gzip': gzip.compress(payload, 6)}
+    if HAS_BROTLI:
+        bodies['br'] = brotli.compress(payload, quality=5)
+    _geojson_cache[key] = (bodies, len(payload), hashlib.blake2b(payload, digest_size=8).hexdigest())
+
+
+def _cached_geojson_response(key):
+    """Serve a cached payload in the best encoding the client accepts.
+
+    Answers 304 Not Modified when the client's ETag matches.
+    """
+    bodies, size, etag = _geojson_cache[key]
+    encoding = next(
+        (enc for enc in ('br', 'gzip') if enc in bodies and request.accept_encodings[enc]),
+        'identity',
+    )
+    response = _json_response(bodies[encoding])
+    response.vary.add('Accept-Encoding')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+        # Each representation needs its own strong ETag
+        etag = f"{etag}-{encoding}"
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = GEOJSON_MAX_AGE
+    return response.make_conditional(request)
 
 
 def _get_graph():
@@ -546,15 +945,24 @@ def _get_lights():
 def get_memory_usage():
     """Get current memory usage in MB."""
     try:
-        process = psutil.Process(os.getpid())
-        return process.memory_info().rss / 1024 / 1024
+        return _get_process().memory_info().rss / 1024 / 1024
     except Exception:
         return 0
 
 
+def _should_log_memory():
+    """Sample every LOG_MEM_EVERY-th request, or every request in debug mode."""
+    if LOG_MEM_EVERY:
+        return next(_request_counter) % LOG_MEM_EVERY == 0
+    return app.debug
+
+
 @app.before_request
 def log_memory_before():
     """Log memory before request."""
+    g.log_memory = _should_log_memory()
+    if not g.log_memory:
+        return
     try:
         g.mem_before = get_memory_usage()
     except Exception:
@@ -564,96 +972,233 @@ def log_memory_before():
 @app.after_request
 def log_memory_after(response):
     """Log memory after request and compute delta."""
+    if not getattr(g, 'log_memory', False):
+        return response
     try:
         mem_after = get_memory_usage()
         mem_before = getattr(g, 'mem_before', 0)
         delta = mem_after - mem_before
-        print(f"[memory] {request.method} {request.path}: {mem_after:.1f}MB (Δ {delta:+.1f}MB)")
+        log.info("[memory] %s %s: %.1fMB (Δ %+.1fMB)", request.method, request.path, mem_after, delta)
     except Exception:
         pass
     return response
 
 
-def _build_full_geojson_cache():
-    """Build and cache the full graph GeoJSON (deterministic)."""
-    if 'graph-data' in _geojson_cache:
-        return
-    compact, lights = _get_graph()
+def _graph_data_response(compact, lights):
+    """Full graph GeoJSON response: every edge, the lights and the bbox."""
     edges_fc = graph_to_geojson(compact)
     lights_list = [{"lat": lat, "lon": lon} for lat, lon in lights] if lights else []
-    response = {
-        "bbox": list(BBOX),
+    return {
+        "bbox": list(BBOX),  # (north, south, east, west)
         "edges": edges_fc,
         "lights": lights_list,
         "status": "success"
     }
-    try:
-        payload = json.dumps(response)
-        _geojson_cache['graph-data'] = (response, len(payload))
-    except Exception:
-        _geojson_cache['graph-data'] = (response, None)
 
 
-def _build_lite_geojson_cache():
-    """Build and cache the sampled graph GeoJSON (deterministic)."""
-    if 'graph-data-lite' in _geojson_cache:
+def _build_full_geojson_cache():
+    """Build and cache the full graph GeoJSON (deterministic)."""
+    if 'graph-data' in _geojson_cache:
         return
     compact, lights = _get_graph()
+    _cache_geojson('graph-data', _json_bytes(_graph_data_response(compact, lights)))
+
+
+def _gather_edge_points(compact, edge_idx, u_idx, v_idx):
+    """Flat float64 x/y of the points of each edge in edge_idx, in order.
+
+    Edges without geometry, or given as -1, are drawn as the straight segment
+    between their u_idx and v_idx nodes. Returns (xs, ys, bounds): edge k's
+    points are xs/ys[bounds[k]:bounds[k + 1]].
+    """
+    indptr = compact.edge_geom_indptr
+    has_edge = edge_idx >= 0
+    safe_idx = np.where(has_edge, edge_idx, 0)
+    starts = indptr[safe_idx].astype(np.int64)
+    ends = indptr[safe_idx + 1].astype(np.int64)
+    has_geom = has_edge & (ends > starts)
+    counts = np.where(has_geom, ends - starts, 2)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    # Position of every output point within its edge, in edge order
+    local = np.arange(int(bounds[-1])) - np.repeat(bounds[:-1], counts)
+    point_has_geom = np.repeat(has_geom, counts)
+    xs = np.empty(len(local), dtype=np.float64)
+    ys = np.empty(len(local), dtype=np.float64)
+    point_idx = (np.repeat(starts, counts) + local)[point_has_geom]
+    xs[point_has_geom] = compact.edge_geom_x[point_idx]
+    ys[point_has_geom] = compact.edge_geom_y[point_idx]
+    if not point_has_geom.all():
+        straight = ~point_has_geom
+        node_idx = np.where(local[straight] == 0, np.repeat(u_idx, counts)[straight], np.repeat(v_idx, counts)[straight])
+        xs[straight] = compact.node_x[node_idx]
+        ys[straight] = compact.node_y[node_idx]
+    return xs, ys, bounds
+
+
+def _graph_lite_response(compact, lights):
+    """Sampled, reduced-precision graph GeoJSON response (~1000 edges, 5-decimal coordinates).
+
+    Only every sample_interval-th edge is touched: the sampled edges' points
+    (node endpoints for edges without geometry) are gathered and rounded in
+    one NumPy pass, then sliced back per edge.
+    """
     total_edges = len(compact.edge_u_idx)
     sample_interval = max(1, total_edges // 1000)
-    features = []
-    i = 0
-    for edge_idx in range(total_edges):
-        if (i % sample_interval) != 0:
-            i += 1
-            continue
-        start = int(compact.edge_geom_indptr[edge_idx])
-        end = int(compact.edge_geom_indptr[edge_idx + 1])
-        if end > start:
-            coords = [[round(float(x), 5), round(float(y), 5)] for x, y in zip(compact.edge_geom_x[start:end], compact.edge_geom_y[start:end])]
-        else:
-            u_idx = int(compact.edge_u_idx[edge_idx])
-            v_idx = int(compact.edge_v_idx[edge_idx])
-            coords = [
-                [round(float(compact.node_x[u_idx]), 5), round(float(compact.node_y[u_idx]), 5)],
-                [round(float(compact.node_x[v_idx]), 5), round(float(compact.node_y[v_idx]), 5)]
-            ]
-
-        length_val = float(compact.edge_length[edge_idx])
-        safety_val = 100.0 - float(compact.edge_danger[edge_idx])
-
-        features.append({
-            'type': 'Feature',
-            'geometry': {'type': 'LineString', 'coordinates': coords},
-            'properties': {
-                'safety_score': safety_val,
-                'light_count': int(compact.edge_light_count[edge_idx]) if compact.edge_light_count.size else 0,
-                'curve_score': 0,
-                'darkness_score': float(compact.edge_darkness_score[edge_idx]) if compact.edge_darkness_score.size else 0.0,
-                'highway_risk': 1,
-                'highway_tag': None,
-                'land_risk': float(compact.edge_land_risk[edge_idx]) if compact.edge_land_risk.size else 0.6,
-                'land_label': 'Unknown'
+    sel = np.arange(0, total_edges, sample_interval, dtype=np.int64)
+
+    def _sampled(arr, default):
+        return _edge_column(arr[sel] if arr.size else arr, default, len(sel))
+
+    light_counts = _sampled(compact.edge_light_count, 0)
+    darkness = _sampled(compact.edge_darkness_score, 0.0)
+    land_risk = _sampled(compact.edge_land_risk, 0.6)
+    safety = (100.0 - compact.edge_danger[sel].astype(np.float64)).tolist()
+
+    xs, ys, bounds = _gather_edge_points(compact, sel, compact.edge_u_idx[sel], compact.edge_v_idx[sel])
+    points = np.round(np.column_stack((xs, ys)), 5).tolist()
+    bounds = bounds.tolist()
+
+    with _gc_paused():
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'LineString', 'coordinates': points[lo:hi]},
+                'properties': {
+                    'safety_score': edge_safety,
+                    'light_count': edge_lights,
+                    'curve_score': 0,
+                    'darkness_score': edge_darkness,
+                    'highway_risk': 1,
+                    'highway_tag': None,
+                    'land_risk': edge_land_risk,
+                    'land_label': 'Unknown'
+                }
             }
-        })
-        i += 1
+            for lo, hi, edge_safety, edge_lights, edge_darkness, edge_land_risk
+            in zip(bounds[:-1], bounds[1:], safety, light_counts, darkness, land_risk)
+        ]
+
+    # Lights get the same 5-decimal precision as the edge points
+    light_coords = np.round(_get_light_index(lights)[0], 5).tolist() if lights else []
+    lights_list = [{"lat": lat, "lon": lon} for lat, lon in light_coords]
+    return {'status': 'success', 'edges': {'type': 'FeatureCollection', 'features': features}, 'lights': lights_list}
+
+
+def _build_lite_geojson_cache():
+    """Build and cache the sampled graph GeoJSON (deterministic)."""
+    if 'graph-data-lite' in _geojson_cache:
+        return
+    compact, lights = _get_graph()
+    _cache_geojson('graph-data-lite', _json_bytes(_graph_lite_response(compact, lights)))
 
-    response = {'status': 'success', 'edges': {'type': 'FeatureCollection', 'features': features}, 'lights': [{"lat": lat, "lon": lon} for lat, lon in lights] if lights else []}
+
+def _preview_node_id(node_id):
+    """Node ID as a plain int for JSON; fallback to string if not castable."""
     try:
-        payload = json.dumps(response)
-        _geojson_cache['graph-data-lite'] = (response, len(payload))
+        return int(node_id)
     except Exception:
-        _geojson_cache['graph-data-lite'] = (response, None)
+        return str(node_id)
+
+
+def _graph_summary_response(compact, lights):
+    """Graph counts plus a preview of the first 50 edges (no geometry)."""
+    k = min(50, len(compact.edge_u_idx))
+    u_ids = compact.node_ids[compact.edge_u_idx[:k]].tolist()
+    v_ids = compact.node_ids[compact.edge_v_idx[:k]].tolist()
+    lengths = compact.edge_length[:k].astype(np.float64).tolist()
+    safety = (100.0 - compact.edge_danger[:k].astype(np.float64)).tolist()
+    light_counts = _edge_column(compact.edge_light_count[:k], 0, k)
+    preview = [
+        {
+            'u': _preview_node_id(u_id), 'v': _preview_node_id(v_id),
+            'length': length,
+            'safety_score': safety_score,
+            'light_count': light_count
+        }
+        for u_id, v_id, length, safety_score, light_count in zip(u_ids, v_ids, lengths, safety, light_counts)
+    ]
+
+    return {
+        'status': 'success',
+        'bbox': list(BBOX),
+        'nodes': len(compact.node_ids),
+        'edges': len(compact.edge_u_idx),
+        'lights': len(lights) if lights else 0,
+        'preview_edges': preview
+    }
+
+
+def _build_summary_cache():
+    """Build and cache the graph summary (deterministic)."""
+    if 'graph-summary' in _geojson_cache:
+        return
+    compact, lights = _get_graph()
+    response = _graph_summary_response(compact, lights)
+    _cache_geojson('graph-summary', _json_bytes(response))
+    log.info("[api] /api/graph-summary ready — nodes=%d edges=%d lights=%d", response['nodes'], response['edges'], response['lights'])
+
+
+def _sidewalks_response(compact):
+    """GeoJSON of the edges with explicit OSM sidewalk data scoring >= 0.8.
+
+    The edges are picked with one boolean mask and their endpoints gathered
+    in bulk; only the matching edges are turned into feature dicts.
+    """
+    if compact.edge_has_explicit_sidewalk.size and compact.edge_sidewalk.size:
+        scores = compact.edge_sidewalk.astype(np.float64)
+        sel = np.flatnonzero((compact.edge_has_explicit_sidewalk != 0) & (scores >= 0.8))
+    else:
+        sel = np.empty(0, dtype=np.int64)
+    u_idx = compact.edge_u_idx[sel]
+    v_idx = compact.edge_v_idx[sel]
+    # (n, 2, 2): [[u_x, u_y], [v_x, v_y]] per edge
+    coords = np.stack([
+        np.column_stack((compact.node_x[u_idx], compact.node_y[u_idx])),
+        np.column_stack((compact.node_x[v_idx], compact.node_y[v_idx])),
+    ], axis=1).astype(np.float64).tolist()
+    sidewalk_scores = compact.edge_sidewalk[sel].astype(np.float64).tolist()
+
+    with _gc_paused():
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'LineString',
+                    'coordinates': edge_coords
+                },
+                'properties': {
+                    'sidewalk_score': sidewalk_score,
+                    'sidewalk': None,
+                    'highway': None
+                }
+            }
+            for edge_coords, sidewalk_score in zip(coords, sidewalk_scores)
+        ]
+
+    return {
+        'type': 'FeatureCollection',
+        'features': features
+    }
+
+
+def _build_sidewalks_geojson_cache():
+    """Build and cache the sidewalks GeoJSON (deterministic)."""
+    if 'sidewalks' in _geojson_cache:
+        return
+    compact = _get_compact_graph()
+    _cache_geojson('sidewalks', _json_bytes(_sidewalks_response(compact)))
 
 
 def _warm_geojson_caches():
-    """Build both caches at startup to avoid lazy work on first request."""
+    """Build the GeoJSON caches at startup to avoid lazy work on first request."""
     _build_full_geojson_cache()
     _build_lite_geojson_cache()
+    _build_summary_cache()
+    _build_sidewalks_geojson_cache()
 
 
 def _warm_route_computation():
-    """Prime a tiny route computation so first user request is fast."""
+    """Prime snapping, the business recompute and a tiny route so first user request is fast."""
     try:
         compact = _get_compact_graph()
         try:
@@ -673,6 +1218,20 @@ def _warm_route_computation():
         except Exception as warm_err:
             print(f"[startup] Route warm-up nearest-node skipped: {warm_err}")
 
+        # Cache the float64 recompute inputs and run the business-score kernel and
+        # midpoint KD-tree query once (results discarded, scores untouched)
+        try:
+            _recompute_edge_weights(
+                *_static_recompute_inputs(compact),
+                np.full(len(compact.edge_u_idx), BUSINESS_SCORE_FAR),
+            )
+            if hasattr(compact, 'edge_mid_lat_rad'):
+                _count_businesses_near_edges(
+                    compact, compact.edge_mid_lat_rad[:1], compact.edge_mid_lon_rad[:1], PROXIMITY_THRESHOLD_KM
+                )
+        except Exception as warm_err:
+            print(f"[startup] Route warm-up business recompute skipped: {warm_err}")
+
         # Run a quick shortest-path to warm routing internals
         try:
             path, edge_indices = compact.shortest_path(u, v, weight="fastest")
@@ -687,28 +1246,71 @@ def _warm_route_computation():
         print(f"[startup] Route warm-up failed: {e}")
 
 
+@contextlib.contextmanager
+def _gc_paused():
+    """Suspend the cyclic GC while building large, acyclic JSON-bound structures.
+
+    Allocating tens of thousands of feature dicts otherwise triggers repeated
+    generation scans that cost more than building the dicts themselves.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _edge_column(arr, default, count):
+    """Per-edge field as a Python list (one bulk conversion); `count` defaults if the field is empty."""
+    return arr.tolist() if arr.size else [default] * count
+
+
 def graph_to_geojson(compact):
-    """Convert compact graph to GeoJSON for map visualization."""
+    """Convert compact graph to GeoJSON for map visualization.
+
+    Every per-edge field is converted to a Python list once up front, so the
+    feature loop only does list indexing instead of NumPy scalar access.
+    The result is usually passed straight to _json_bytes().
+    """
     features = []
     edge_count = len(compact.edge_u_idx)
 
-    for i in range(edge_count):
-        try:
-            start = int(compact.edge_geom_indptr[i])
-            end = int(compact.edge_geom_indptr[i + 1])
+    indptr = compact.edge_geom_indptr.tolist()
+    geom_x = compact.edge_geom_x.tolist()
+    geom_y = compact.edge_geom_y.tolist()
+    node_x = compact.node_x.tolist()
+    node_y = compact.node_y.tolist()
+    edge_u = compact.edge_u_idx.tolist()
+    edge_v = compact.edge_v_idx.tolist()
+    length = compact.edge_length.tolist()
+    danger = compact.edge_danger.tolist()
+    light_count = _edge_column(compact.edge_light_count, 0, edge_count)
+    darkness = _edge_column(compact.edge_darkness_score, 0.0, edge_count)
+    sidewalk = _edge_column(compact.edge_sidewalk, 0.0, edge_count)
+    business_score = _edge_column(compact.edge_business_score, 0.5, edge_count)
+    business_count = _edge_column(compact.edge_business_count, 0, edge_count)
+    is_footpath = _edge_column(compact.edge_is_footpath, False, edge_count)
+    land_risk = _edge_column(compact.edge_land_risk, 0.6, edge_count)
+    speed_risk = _edge_column(compact.edge_speed_risk, 0.0, edge_count)
+    travel_time = _edge_column(compact.edge_travel_time, 0.0, edge_count)
+    speed_kph = _edge_column(compact.edge_speed_kph, 5.0, edge_count)
+
+    with _gc_paused():
+        for i in range(edge_count):
+            start = indptr[i]
+            end = indptr[i + 1]
             if end > start:
-                coords = [[float(x), float(y)] for x, y in zip(compact.edge_geom_x[start:end], compact.edge_geom_y[start:end])]
+                coords = list(map(list, zip(geom_x[start:end], geom_y[start:end])))
             else:
-                u_idx = int(compact.edge_u_idx[i])
-                v_idx = int(compact.edge_v_idx[i])
+                u_idx = edge_u[i]
+                v_idx = edge_v[i]
                 coords = [
-                    [float(compact.node_x[u_idx]), float(compact.node_y[u_idx])],
-                    [float(compact.node_x[v_idx]), float(compact.node_y[v_idx])]
+                    [node_x[u_idx], node_y[u_idx]],
+                    [node_x[v_idx], node_y[v_idx]]
                 ]
 
-            length_val = float(compact.edge_length[i])
-            danger_val = float(compact.edge_danger[i])
-
             features.append({
                 "type": "Feature",
                 "geometry": {
@@ -716,28 +1318,25 @@ def graph_to_geojson(compact):
                     "coordinates": coords
                 },
                 "properties": {
-                    "danger_score": danger_val,
-                    "light_count": int(compact.edge_light_count[i]) if compact.edge_light_count.size else 0,
-                    "darkness_score": float(compact.edge_darkness_score[i]) if compact.edge_darkness_score.size else 0.0,
-                    "sidewalk_score": float(compact.edge_sidewalk[i]) if compact.edge_sidewalk.size else 0.0,
-                    "business_score": float(compact.edge_business_score[i]) if compact.edge_business_score.size else 0.5,
-                    "business_count": int(compact.edge_business_count[i]) if compact.edge_business_count.size else 0,
+                    "danger_score": danger[i],
+                    "light_count": light_count[i],
+                    "darkness_score": darkness[i],
+                    "sidewalk_score": sidewalk[i],
+                    "business_score": business_score[i],
+                    "business_count": business_count[i],
                     "business_name": None,
                     "business_hours": [],
-                    "is_footpath": bool(compact.edge_is_footpath[i]) if compact.edge_is_footpath.size else False,
+                    "is_footpath": is_footpath[i],
                     "highway": "unknown",
-                    "land_risk": float(compact.edge_land_risk[i]) if compact.edge_land_risk.size else 0.6,
+                    "land_risk": land_risk[i],
                     "land_label": "Unknown",
-                    "speed_risk": float(compact.edge_speed_risk[i]) if compact.edge_speed_risk.size else 0.0,
-                    "travel_time": float(compact.edge_travel_time[i]) if compact.edge_travel_time.size else 0.0,
-                    "length": length_val,
-                    "speed_kph": float(compact.edge_speed_kph[i]) if compact.edge_speed_kph.size else 5.0,
+                    "speed_risk": speed_risk[i],
+                    "travel_time": travel_time[i],
+                    "length": length[i],
+                    "speed_kph": speed_kph[i],
                     "name": "Unknown"
                 }
             })
-        except Exception as e:
-            print(f"Error processing edge #{i}: {e}")
-            continue
 
     return {
         "type": "FeatureCollection",
@@ -750,63 +1349,45 @@ def route_to_geojson(route_nodes, compact, route_type="fastest", edge_indices=No
     if not route_nodes or len(route_nodes) < 2:
         return None
     
-    coords = []
     properties = {
         "type": route_type,
         "length": 0,
         "travel_time": 0,
         "safety_score": 0
     }
-    safety_weighted_sum = 0.0
     
     try:
         if edge_indices is None:
             edge_indices = list(range(len(route_nodes) - 1))
 
-        for i in range(len(route_nodes) - 1):
-            u_id = route_nodes[i]
-            v_id = route_nodes[i + 1]
-            u_idx = compact.node_id_to_idx.get(u_id)
-            v_idx = compact.node_id_to_idx.get(v_id)
-            if u_idx is None or v_idx is None:
-                continue
-
-            edge_idx = edge_indices[i] if i < len(edge_indices) else None
-            if edge_idx is not None:
-                edge_length = float(compact.edge_length[edge_idx])
-                properties["length"] += edge_length
-                properties["travel_time"] += float(compact.edge_travel_time[edge_idx])
-                safety = 100.0 - float(compact.edge_danger[edge_idx])
-                safety_weighted_sum += safety * edge_length
-
-                start = int(compact.edge_geom_indptr[edge_idx])
-                end = int(compact.edge_geom_indptr[edge_idx + 1])
-                if end > start:
-                    pts = [[float(x), float(y)] for x, y in zip(compact.edge_geom_x[start:end], compact.edge_geom_y[start:end])]
-                else:
-                    pts = [
-                        [float(compact.node_x[u_idx]), float(compact.node_y[u_idx])],
-                        [float(compact.node_x[v_idx]), float(compact.node_y[v_idx])]
-                    ]
-            else:
-                pts = [
-                    [float(compact.node_x[u_idx]), float(compact.node_y[u_idx])],
-                    [float(compact.node_x[v_idx]), float(compact.node_y[v_idx])]
-                ]
-
-            if not coords:
-                coords.extend(pts)
-            else:
-                if coords[-1] == pts[0]:
-                    coords.extend(pts[1:])
-                else:
-                    coords.extend(pts)
+        # Node and edge indices of every segment whose nodes are in the graph (-1: no edge)
+        node_idx = [compact.node_id_to_idx.get(n) for n in route_nodes]
+        segments = [
+            (u_idx, v_idx, edge_indices[i] if i < len(edge_indices) else -1)
+            for i, (u_idx, v_idx) in enumerate(zip(node_idx, node_idx[1:]))
+            if u_idx is not None and v_idx is not None
+        ]
+        seg_u, seg_v, seg_edge = np.array(segments, dtype=np.int64).reshape(-1, 3).T
+
+        xs, ys, bounds = _gather_edge_points(compact, seg_edge, seg_u, seg_v)
+        # Drop each segment's first point where it repeats the previous segment's last
+        keep = np.ones(len(xs), dtype=bool)
+        firsts, lasts = bounds[1:-1], bounds[1:-1] - 1
+        keep[firsts[(xs[firsts] == xs[lasts]) & (ys[firsts] == ys[lasts])]] = False
+        coords = np.column_stack((xs[keep], ys[keep])).tolist()
+
+        # Route totals in one gather per field; safety is length-weighted
+        edge_idx = seg_edge[seg_edge >= 0]
+        if len(edge_idx):
+            lengths = compact.edge_length[edge_idx].astype(np.float64)
+            properties["length"] = float(lengths.sum())
+            properties["travel_time"] = float(compact.edge_travel_time[edge_idx].sum(dtype=np.float64))
+            safety_weighted_sum = float(np.dot(100.0 - compact.edge_danger[edge_idx].astype(np.float64), lengths))
+            if properties["length"] > 0:
+                properties["safety_score"] = safety_weighted_sum / properties["length"]
     except Exception as e:
-        print(f"Error building route GeoJSON: {e}")
+        log.error("Error building route GeoJSON: %s", e)
         return None
-
-    if properties["length"] > 0:
-        properties["safety_score"] = safety_weighted_sum / properties["length"]
     
     return {
         "type": "Feature",
@@ -844,49 +1425,33 @@ def api_graph_data():
     
     # Return cached response if available and no departure_time
     if not departure_time and 'graph-data' in _geojson_cache:
-        print('[api] /api/graph-data request received (cached)')
-        cached_response, cached_size = _geojson_cache['graph-data']
-        return jsonify(cached_response)
+        log.debug('[api] /api/graph-data request received (cached)')
+        return _cached_geojson_response('graph-data')
     
     try:
         t0 = time.time()
-        if departure_time:
-            print(f'[api] /api/graph-data request received with departure_time={departure_time}')
-        else:
-            print('[api] /api/graph-data request received (building cache)')
-        
+        if not departure_time:
+            log.debug('[api] /api/graph-data request received (building cache)')
+            _build_full_geojson_cache()
+            _, size, _ = _geojson_cache['graph-data']
+            log.info("[api] /api/graph-data cached — bytes=%d time_s=%.2f", size, time.time() - t0)
+            return _cached_geojson_response('graph-data')
+
+        log.debug('[api] /api/graph-data request received with departure_time=%s', departure_time)
         compact, lights = _get_graph()
         
-        # Recalculate business scores if departure_time provided
-        if departure_time and _businesses_cache:
-            _maybe_recalculate_business_scores_compact(compact, _businesses_cache, departure_time)
-
-        # Build response with graph edges, lights, and bbox
-        edges_fc = graph_to_geojson(compact)
-        lights_list = [{"lat": lat, "lon": lon} for lat, lon in lights] if lights else []
-        response = {
-            "bbox": list(BBOX),  # (north, south, east, west)
-            "edges": edges_fc,
-            "lights": lights_list,
-            "status": "success"
-        }
+        # Recalculate business scores for the departure time and build from that snapshot
+        compact = _maybe_recalculate_business_scores_compact(compact, _businesses_cache, departure_time)
 
-        # Cache the response only if no departure_time
-        if not departure_time:
-            try:
-                payload = json.dumps(response)
-                size = len(payload)
-                _geojson_cache['graph-data'] = (response, size)
-            except Exception:
-                size = None
-        else:
-            size = len(json.dumps(response))
-            
+        # Per-departure payloads aren't cached: stream them out as they encode
+        response = _graph_data_response(compact, lights)
+        features = response['edges']['features']
+        response['edges'] = dict(response['edges'], features=[])
         elapsed = time.time() - t0
-        print(f"[api] /api/graph-data {'cached' if not departure_time else 'computed'} — edges={len(edges_fc.get('features',[]))} bytes={size} time_s={elapsed:.2f}")
-        return jsonify(response)
+        log.info("[api] /api/graph-data computed — edges=%d time_s=%.2f (streaming)", len(features), elapsed)
+        return _json_response(_iter_feature_collection_json(response, features))
     except Exception as e:
-        print(f"[api] /api/graph-data error: {e}")
+        log.error("[api] /api/graph-data error: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
@@ -899,70 +1464,17 @@ def api_graph_data_lite():
     """
     # Return cached response if available
     if 'graph-data-lite' in _geojson_cache:
-        print('[api] /api/graph-data-lite request received (cached)')
-        cached_response, cached_size = _geojson_cache['graph-data-lite']
-        return jsonify(cached_response)
+        log.debug('[api] /api/graph-data-lite request received (cached)')
+        return _cached_geojson_response('graph-data-lite')
     
     try:
-        print('[api] /api/graph-data-lite request received (building cache)')
-        compact, lights = _get_graph()
-
-        # sample edges: take every Nth edge to keep payload small
-        total_edges = len(compact.edge_u_idx)
-        sample_interval = max(1, total_edges // 1000)  # aim for ~1000 edges
-
-        features = []
-        i = 0
-        for edge_idx in range(total_edges):
-            if (i % sample_interval) != 0:
-                i += 1
-                continue
-            start = int(compact.edge_geom_indptr[edge_idx])
-            end = int(compact.edge_geom_indptr[edge_idx + 1])
-            if end > start:
-                coords = [[round(float(x), 5), round(float(y), 5)] for x, y in zip(compact.edge_geom_x[start:end], compact.edge_geom_y[start:end])]
-            else:
-                u_idx = int(compact.edge_u_idx[edge_idx])
-                v_idx = int(compact.edge_v_idx[edge_idx])
-                coords = [
-                    [round(float(compact.node_x[u_idx]), 5), round(float(compact.node_y[u_idx]), 5)],
-                    [round(float(compact.node_x[v_idx]), 5), round(float(compact.node_y[v_idx]), 5)]
-                ]
-
-            length_val = float(compact.edge_length[edge_idx])
-            safety_val = 100.0 - float(compact.edge_danger[edge_idx])
-
-            features.append({
-                'type': 'Feature',
-                'geometry': {'type': 'LineString', 'coordinates': coords},
-                'properties': {
-                    'safety_score': safety_val,
-                    'light_count': int(compact.edge_light_count[edge_idx]) if compact.edge_light_count.size else 0,
-                    'curve_score': 0,
-                    'darkness_score': float(compact.edge_darkness_score[edge_idx]) if compact.edge_darkness_score.size else 0.0,
-                    'highway_risk': 1,
-                    'highway_tag': None,
-                    'land_risk': float(compact.edge_land_risk[edge_idx]) if compact.edge_land_risk.size else 0.6,
-                    'land_label': 'Unknown'
-                }
-            })
-            i += 1
-
-        response = {'type': 'FeatureCollection', 'features': features}
-        lights_list = [{"lat": lat, "lon": lon} for lat, lon in lights] if lights else []
-        full_response = {'status': 'success', 'edges': response, 'lights': lights_list}
-        
-        # Cache the response for future requests
-        try:
-            payload = json.dumps(full_response)
-            _geojson_cache['graph-data-lite'] = (full_response, len(payload))
-            print(f"[api] /api/graph-data-lite cached — features={len(features)} sampled_from={total_edges} size={len(payload)} bytes")
-        except Exception as cache_err:
-            print(f"[api] /api/graph-data-lite cache save failed: {cache_err}")
-        
-        return jsonify(full_response)
+        log.debug('[api] /api/graph-data-lite request received (building cache)')
+        _build_lite_geojson_cache()
+        _, size, _ = _geojson_cache['graph-data-lite']
+        log.info("[api] /api/graph-data-lite cached — size=%d bytes", size)
+        return _cached_geojson_response('graph-data-lite')
     except Exception as e:
-        print(f"[api] /api/graph-data-lite error: {e}")
+        log.error("[api] /api/graph-data-lite error: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -971,87 +1483,28 @@ def api_graph_summary():
     """Return a lightweight summary of the graph (counts and small preview).
 
     This is intended for quick client-side load to avoid large GeoJSON downloads.
+    Response is cached since the graph is fixed.
     """
     try:
-        print('[api] /api/graph-summary request received')
-
-        compact, lights = _get_graph()
-
-        # prepare a small preview of edges (no geometry), up to 50 entries
-        preview = []
-        max_preview = 50
-        for i in range(len(compact.edge_u_idx)):
-            if i >= max_preview:
-                break
-            # try to include simple ints for nodes; fallback to string if not castable
-            try:
-                u_id = int(compact.node_ids[int(compact.edge_u_idx[i])])
-            except Exception:
-                u_id = str(compact.node_ids[int(compact.edge_u_idx[i])])
-            try:
-                v_id = int(compact.node_ids[int(compact.edge_v_idx[i])])
-            except Exception:
-                v_id = str(compact.node_ids[int(compact.edge_v_idx[i])])
-            preview.append({
-                'u': u_id, 'v': v_id,
-                'length': float(compact.edge_length[i]),
-                'safety_score': 100.0 - float(compact.edge_danger[i]),
-                'light_count': int(compact.edge_light_count[i]) if compact.edge_light_count.size else 0
-            })
-
-        response = {
-            'status': 'success',
-            'bbox': list(BBOX),
-            'nodes': len(compact.node_ids),
-            'edges': len(compact.edge_u_idx),
-            'lights': len(lights) if lights else 0,
-            'preview_edges': preview
-        }
-        print(f"[api] /api/graph-summary ready — nodes={response['nodes']} edges={response['edges']} lights={response['lights']}")
-        return jsonify(response)
+        log.debug('[api] /api/graph-summary request received')
+        _build_summary_cache()
+        return _cached_geojson_response('graph-summary')
     except Exception as e:
-        print(f"[api] /api/graph-summary error: {e}")
+        log.error("[api] /api/graph-summary error: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @app.route('/api/sidewalks', methods=['GET'])
 def api_sidewalks():
-    """Return GeoJSON of streets with explicit sidewalk data from OSM."""
-    try:
-        compact, _ = _get_graph()
+    """Return GeoJSON of streets with explicit sidewalk data from OSM.
 
-        features = []
-        for i in range(len(compact.edge_u_idx)):
-            has_explicit = bool(compact.edge_has_explicit_sidewalk[i]) if compact.edge_has_explicit_sidewalk.size else False
-            sidewalk_score = float(compact.edge_sidewalk[i]) if compact.edge_sidewalk.size else 0.0
-
-            if has_explicit and sidewalk_score >= 0.8:
-                u_idx = int(compact.edge_u_idx[i])
-                v_idx = int(compact.edge_v_idx[i])
-                coords = [
-                    [float(compact.node_x[u_idx]), float(compact.node_y[u_idx])],
-                    [float(compact.node_x[v_idx]), float(compact.node_y[v_idx])]
-                ]
-
-                features.append({
-                    'type': 'Feature',
-                    'geometry': {
-                        'type': 'LineString',
-                        'coordinates': coords
-                    },
-                    'properties': {
-                        'sidewalk_score': sidewalk_score,
-                        'sidewalk': None,
-                        'highway': None
-                    }
-                })
-        
-        return jsonify({
-            'type': 'FeatureCollection',
-            'features': features
-        })
+    Response is cached since the sidewalk data is fixed.
+    """
+    try:
+        _build_sidewalks_geojson_cache()
+        return _cached_geojson_response('sidewalks')
     except Exception as e:
-        print(f"Error fetching sidewalks: {e}")
+        log.error("Error fetching sidewalks: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -1067,37 +1520,57 @@ def api_businesses():
         # Return businesses as simple list of dicts
         business_list = []
         if _businesses_cache:
-            for biz in _businesses_cache:
-                # Handle both old (lat, lon, name, btype) and new (lat, lon, name, btype, hours, review_count, is_open) formats
-                if len(biz) >= 4:
-                    lat, lon, name, btype = biz[:4]
-                    hours = biz[4] if len(biz) > 4 else []
-                    review_count = biz[5] if len(biz) > 5 else 0
-                    is_open = biz[6] if len(biz) > 6 else True
-                    
-                    # Filter by departure_time if provided
-                    if departure_time:
-                        if not is_business_open_at_time(hours, departure_time):
-                            continue  # Skip closed businesses
-                    
-                    business_list.append({
-                        'lat': lat,
-                        'lon': lon,
-                        'name': name,
-                        'type': btype,
-                        'hours': hours if isinstance(hours, list) else [],
-                        'review_count': review_count,
-                        'is_open': is_open
-                    })
+            arrays = _get_business_arrays(_businesses_cache)
+            # Filter by departure_time if provided: one column of the prebuilt open-hours bitmap
+            day_minutes = _local_day_minutes(departure_time) if departure_time else None
+            if day_minutes is None:
+                business_list = [record for record in arrays.records if record is not None]
+            else:
+                open_now = _open_at_minute(arrays.open_week, *day_minutes)
+                business_list = [arrays.records[i] for i in np.flatnonzero(open_now).tolist() if arrays.records[i] is not None]
         
         return jsonify(business_list)
     except Exception as e:
-        print(f"Error fetching businesses: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error fetching businesses: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+def _count_lit_segments(mid_lat, mid_lon, light_coords, light_tree=None, radius=LIGHT_RADIUS_DEG):
+    """Number of segment midpoints with a streetlight closer than radius degrees.
+
+    Distances are taken in the midpoints' dtype, like the scalar check they
+    replace. With a KD-tree only the lights it finds within a slightly padded
+    radius are checked; otherwise midpoints are compared against all lights
+    in blocks.
+    """
+    if len(mid_lat) == 0 or len(light_coords) == 0:
+        return 0
+    radius = mid_lat.dtype.type(radius)
+    if light_tree is not None:
+        mids = np.column_stack((mid_lat, mid_lon)).astype(np.float64)
+        # Pad the search by a few units in the last place of the midpoint dtype (float32
+        # coordinates are only good to ~1e-5 degrees) and settle it with the exact check
+        pad = 8 * float(np.spacing(np.abs(mids).max().astype(mid_lat.dtype)))
+        candidates = light_tree.query_ball_point(mids, r=float(radius) + pad)
+        counts = np.fromiter(map(len, candidates), dtype=np.int64, count=len(candidates))
+        seg = np.repeat(np.arange(len(candidates)), counts)
+        light = np.fromiter(itertools.chain.from_iterable(candidates), dtype=np.int64, count=int(counts.sum()))
+        near = light_coords[light].astype(mid_lat.dtype, copy=False)
+        dy = near[:, 0] - mid_lat[seg]
+        dx = near[:, 1] - mid_lon[seg]
+        return int(np.unique(seg[np.sqrt(dy * dy + dx * dx) < radius]).size)
+    light_lat = light_coords[:, 0].astype(mid_lat.dtype, copy=False)
+    light_lon = light_coords[:, 1].astype(mid_lat.dtype, copy=False)
+    block = max(1, HAVERSINE_BLOCK_PAIRS // len(light_lat))
+    lit = 0
+    for start in range(0, len(mid_lat), block):
+        dy = light_lat - mid_lat[start:start + block, None]
+        dx = light_lon - mid_lon[start:start + block, None]
+        dist = np.sqrt(dy * dy + dx * dx)
+        lit += int((dist < radius).any(axis=1).sum())
+    return lit
+
+
 def calculate_route_walking_metrics(route_nodes, G, lights, bbox, compact_graph=None, edge_indices=None):
     """Calculate walking-specific metrics for a route.
     
@@ -1123,40 +1596,22 @@ def calculate_route_walking_metrics(route_nodes, G, lights, bbox, compact_graph=
     
     try:
         # Calculate lighting score (percentage of segments with nearby streetlights)
-        lit_segments = 0
         total_segments = len(route_nodes) - 1
         
         if total_segments > 0:
-            for i in range(len(route_nodes) - 1):
-                node1 = route_nodes[i]
-                node2 = route_nodes[i + 1]
+            # Get node coordinates; segments with an unknown node count as unlit
+            if compact_graph is not None:
+                idx = [compact_graph.node_id_to_idx.get(n) for n in route_nodes]
+                pairs = [(a, b) for a, b in zip(idx, idx[1:]) if a is not None and b is not None]
+                pair_idx = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+                lat = compact_graph.node_y[pair_idx]
+                lon = compact_graph.node_x[pair_idx]
+            else:
+                lat = np.array([[G.nodes[a]['y'], G.nodes[b]['y']] for a, b in zip(route_nodes, route_nodes[1:])], dtype=np.float64).reshape(-1, 2)
+                lon = np.array([[G.nodes[a]['x'], G.nodes[b]['x']] for a, b in zip(route_nodes, route_nodes[1:])], dtype=np.float64).reshape(-1, 2)
 
-                # Get node coordinates
-                if compact_graph is not None:
-                    idx1 = compact_graph.node_id_to_idx.get(node1)
-                    idx2 = compact_graph.node_id_to_idx.get(node2)
-                    if idx1 is None or idx2 is None:
-                        continue
-                    lat1, lon1 = compact_graph.node_y[idx1], compact_graph.node_x[idx1]
-                    lat2, lon2 = compact_graph.node_y[idx2], compact_graph.node_x[idx2]
-                else:
-                    lat1, lon1 = G.nodes[node1]['y'], G.nodes[node1]['x']
-                    lat2, lon2 = G.nodes[node2]['y'], G.nodes[node2]['x']
-                
-                # Check if any streetlights are near this segment (within ~100 meters)
-                segment_midpoint_lat = (lat1 + lat2) / 2
-                segment_midpoint_lon = (lon1 + lon2) / 2
-                
-                has_light = False
-                for light_lat, light_lon in lights:
-                    # Simple distance check (~0.001 degrees ≈ 111 meters)
-                    dist = ((light_lat - segment_midpoint_lat) ** 2 + (light_lon - segment_midpoint_lon) ** 2) ** 0.5
-                    if dist < 0.001:  # ~111 meters
-                        has_light = True
-                        break
-                
-                if has_light:
-                    lit_segments += 1
+            # Check if any streetlights are near each segment midpoint (within ~100 meters)
+            lit_segments = _count_lit_segments((lat[:, 0] + lat[:, 1]) / 2, (lon[:, 0] + lon[:, 1]) / 2, *_get_light_index(lights))
             
             metrics["lighting_score"] = round((lit_segments / total_segments) * 100, 1)
         
@@ -1205,13 +1660,27 @@ def calculate_route_walking_metrics(route_nodes, G, lights, bbox, compact_graph=
         metrics["nearby_businesses"] = nearby_businesses
         
     except Exception as e:
-        print(f"Warning: Could not calculate walking metrics: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Could not calculate walking metrics: %s", e)
     
     return metrics
 
 
+def _route_edge_totals(compact, edge_indices):
+    """distance_m, travel_time_s and length-weighted safety_score of a route's edges.
+
+    Each edge field is gathered once and reduced from the gathered copy.
+    """
+    edge_idx = np.array(edge_indices, dtype=np.int64)
+    lengths = compact.edge_length[edge_idx]
+    danger = compact.edge_danger[edge_idx]
+    total_length = float(lengths.sum())
+    return {
+        "distance_m": total_length,
+        "travel_time_s": float(compact.edge_travel_time[edge_idx].sum()),
+        "safety_score": float(((100.0 - danger) * lengths).sum() / total_length) if total_length > 0 else 0.0,
+    }
+
+
 @app.route('/api/routes', methods=['POST'])
 def api_routes():
     """Compute and return safest walking routes.
@@ -1234,16 +1703,11 @@ def api_routes():
         if not start_input or not end_input:
             return jsonify({"status": "error", "message": "Missing start or end location"}), 400
         
-        # Helper function to check if coordinates are within bounds
-        def is_within_bounds(lat, lon):
-            north, south, east, west = BBOX
-            return south <= lat <= north and west <= lon <= east
-        
         # Parse coordinates if they're provided as [lat, lon]
         if isinstance(start_input, list) and len(start_input) == 2:
             start_lat, start_lon = start_input
         elif isinstance(start_input, str):
-            print(f"Geocoding start: {start_input}")
+            log.debug("Geocoding start: %s", start_input)
             start_lat, start_lon = geocode_address(start_input)
         else:
             return jsonify({"status": "error", "message": "Invalid start format"}), 400
@@ -1258,7 +1722,7 @@ def api_routes():
         if isinstance(end_input, list) and len(end_input) == 2:
             end_lat, end_lon = end_input
         elif isinstance(end_input, str):
-            print(f"Geocoding end: {end_input}")
+            log.debug("Geocoding end: %s", end_input)
             end_lat, end_lon = geocode_address(end_input)
         else:
             return jsonify({"status": "error", "message": "Invalid end format"}), 400
@@ -1276,15 +1740,15 @@ def api_routes():
         # If departure_time is provided, recalculate business proximity scores
         # based on which businesses are actually open at that time
         if departure_time and _businesses_cache:
-            print(f"  Recalculating business scores for departure_time: {departure_time}")
-            _maybe_recalculate_business_scores_compact(compact, _businesses_cache, departure_time)
+            log.debug("  Recalculating business scores for departure_time: %s", departure_time)
+        # Route on a snapshot so a concurrent departure_time can't swap weights mid-request
+        compact = _maybe_recalculate_business_scores_compact(compact, _businesses_cache, departure_time)
         
         # Snap to nearest nodes
-        print(f"Snapping ({start_lat}, {start_lon}) and ({end_lat}, {end_lon}) to graph...")
-        start_node = snap_to_nearest_node(compact, start_lat, start_lon)
-        end_node = snap_to_nearest_node(compact, end_lat, end_lon)
+        log.debug("Snapping (%s, %s) and (%s, %s) to graph...", start_lat, start_lon, end_lat, end_lon)
+        start_node, end_node = snap_to_nearest_nodes(compact, [(start_lat, start_lon), (end_lat, end_lon)])
         
-        print(f"Start node: {start_node}, End node: {end_node}")
+        log.debug("Start node: %s, End node: %s", start_node, end_node)
         
         # Initialize data structures for two routes
         fastest_route = None
@@ -1310,51 +1774,35 @@ def api_routes():
             "nearby_businesses": None
         }
         
-        print("Computing fastest and safest routes (compact graph)...")
+        log.debug("Computing fastest and safest routes (compact graph)...")
         try:
             # Compute fastest route
-            print("  Computing fastest route (compact)...")
+            log.debug("  Computing fastest route (compact)...")
             fastest_route, fastest_edge_indices = compact.shortest_path(start_node, end_node, weight="fastest")
             if fastest_route and fastest_edge_indices:
                 fastest_data["nodes"] = fastest_route
-                edge_idx = np.array(fastest_edge_indices, dtype=np.int64)
-                fastest_data["distance_m"] = float(compact.edge_length[edge_idx].sum())
-                fastest_data["travel_time_s"] = float(compact.edge_travel_time[edge_idx].sum())
+                fastest_data.update(_route_edge_totals(compact, fastest_edge_indices))
                 if fastest_data["travel_time_s"] > 0:
                     fastest_data["avg_speed_kmh"] = (fastest_data["distance_m"] / fastest_data["travel_time_s"]) * 3.6
-                safety = 100.0 - compact.edge_danger[edge_idx]
-                total_length = float(compact.edge_length[edge_idx].sum())
-                if total_length > 0:
-                    fastest_data["safety_score"] = float((safety * compact.edge_length[edge_idx]).sum() / total_length)
-                else:
-                    fastest_data["safety_score"] = 0.0
-                print(f"  Fastest route: {len(fastest_route)} nodes, {fastest_data['travel_time_s']:.0f}s, safety_score={fastest_data['safety_score']:.1f}")
+                log.info("  Fastest route: %d nodes, %.0fs, safety_score=%.1f", len(fastest_route), fastest_data['travel_time_s'], fastest_data['safety_score'])
             else:
                 fastest_edge_indices = None
-                print("  No fastest path found!")
+                log.info("  No fastest path found!")
 
             # Compute safest route
-            print("  Computing safest route (compact)...")
+            log.debug("  Computing safest route (compact)...")
             safest_route, safest_edge_indices = compact.shortest_path(start_node, end_node, weight="safest")
             if safest_route and safest_edge_indices:
                 safest_data["nodes"] = safest_route
-                edge_idx = np.array(safest_edge_indices, dtype=np.int64)
-                safest_data["distance_m"] = float(compact.edge_length[edge_idx].sum())
-                safest_data["travel_time_s"] = float(compact.edge_travel_time[edge_idx].sum())
-                safety = 100.0 - compact.edge_danger[edge_idx]
-                total_length = float(compact.edge_length[edge_idx].sum())
-                if total_length > 0:
-                    safest_data["safety_score"] = float((safety * compact.edge_length[edge_idx]).sum() / total_length)
-                else:
-                    safest_data["safety_score"] = 0.0
-                print(f"  Safest route: {len(safest_route)} nodes, {safest_data['travel_time_s']:.0f}s, safety_score={safest_data['safety_score']:.1f}")
+                safest_data.update(_route_edge_totals(compact, safest_edge_indices))
+                log.info("  Safest route: %d nodes, %.0fs, safety_score=%.1f", len(safest_route), safest_data['travel_time_s'], safest_data['safety_score'])
             else:
                 safest_edge_indices = None
-                print("  No safest path found!")
+                log.info("  No safest path found!")
         except Exception as route_err:
             fastest_edge_indices = None
             safest_edge_indices = None
-            print(f"  Routing error: {route_err}")
+            log.error("  Routing error: %s", route_err)
         
         # Calculate walking metrics for both routes
         if fastest_route:
@@ -1377,8 +1825,8 @@ def api_routes():
         if safest_route and safest_edge_indices:
             safest_geojson = route_to_geojson(safest_route, compact, "safest", edge_indices=safest_edge_indices)
         
-        print(f"  fastest_route nodes: {len(fastest_route) if fastest_route else 0}, geojson: {fastest_geojson is not None}")
-        print(f"  safest_route nodes: {len(safest_route) if safest_route else 0}, geojson: {safest_geojson is not None}")
+        log.debug("  fastest_route nodes: %d, geojson: %s", len(fastest_route) if fastest_route else 0, fastest_geojson is not None)
+        log.debug("  safest_route nodes: %d, geojson: %s", len(safest_route) if safest_route else 0, safest_geojson is not None)
         
         response = {
             "status": "success",
@@ -1397,9 +1845,7 @@ def api_routes():
         return jsonify(response)
     
     except Exception as e:
-        print(f"Error computing routes: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error computing routes: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
@@ -1407,7 +1853,7 @@ def api_routes():
 def api_memory():
     """Monitor memory usage of this process and graph cache statistics."""
     try:
-        process = psutil.Process(os.getpid())
+        process = _get_process()
         mem_info = process.memory_info()
         
         # Calculate compact graph cache stats
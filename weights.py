@@ -0,0 +1,46 @@
+"""Batch versions of the safest_weight formulas tried in the test scripts.
+
+Each function takes per-edge NumPy arrays and returns the routing weight of
+every edge in one pass. `penalty` is the per-edge road penalty from
+road_penalty() (footpaths with sidewalk score >= 0.99 use 1, roads 10); the
+test scripts get it, and `safety`, precomputed from graph_loader.
+"""
+
+import numpy as np
+
+FOOTPATH_PENALTY = 1.0
+ROAD_PENALTY = 10.0
+
+# Danger levels the test scripts tabulate weights for (100m road)
+EXAMPLE_DANGERS = np.array([5, 20, 44, 60, 80, 95])
+
+
+def road_penalty(sidewalk):
+    """Per-edge road penalty: 1 for footpaths, 10 for roads."""
+    return np.where(np.asarray(sidewalk) >= 0.99, FOOTPATH_PENALTY, ROAD_PENALTY)
+
+
+def exponential_weight(length, safety, penalty, exponent=1.5):
+    """weight = length * penalty / safety ^ exponent, with safety = max(1, 100 - danger)"""
+    safety = np.asarray(safety, dtype=np.float64)
+    # safety ^ 1.5 as safety * sqrt(safety): a multiply and a sqrt instead of a pow per edge
+    safety_pow = safety * np.sqrt(safety) if exponent == 1.5 else safety ** exponent
+    return np.asarray(length, dtype=np.float64) * penalty / safety_pow
+
+
+def inverse_safety_weight(length, danger, penalty):
+    """weight = length * penalty / (100 - danger + 1)"""
+    danger = np.asarray(danger, dtype=np.float64)
+    return np.asarray(length, dtype=np.float64) * penalty / (100.0 - danger + 1.0)
+
+
+def danger_ratio_weight(length, danger, penalty):
+    """weight = length * penalty * danger / (100 - danger + 0.01)"""
+    danger = np.asarray(danger, dtype=np.float64)
+    return np.asarray(length, dtype=np.float64) * penalty * (danger / (100.0 - danger + 0.01))
+
+
+def direct_danger_weight(length, danger, penalty):
+    """weight = length * penalty * (danger + 1) / 100"""
+    danger = np.asarray(danger, dtype=np.float64)
+    return np.asarray(length, dtype=np.float64) * penalty * (danger + 1.0) / 100.0